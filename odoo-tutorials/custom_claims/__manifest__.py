@@ -8,8 +8,18 @@
         'security/ir.model.access.csv',
         'security/security.xml',
         'data/sequences.xml',
+        'data/claim_cron.xml',
         'views/claim_views.xml',
+        'views/claim_notification_views.xml',
+        'views/claim_report_views.xml',
+        'views/claim_audit_views.xml',
+        'views/claim_archive_views.xml',
+        'views/claim_cancel_job_views.xml',
+        'views/claim_perf_views.xml',
+        'wizard/claim_import_views.xml',
         'views/claim_menus.xml',
+        'views/res_company_views.xml',
+        'views/res_partner_views.xml',
     ],
     'installable': True,
     'application': True,
@@ -0,0 +1,2 @@
+from . import claims_import
+from . import claims_api_load_test
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo.cli import Command
+
+
+class ClaimsApiLoadTest(Command):
+    """Prova de càrrega de l'API de reclamacions contra un servidor local"""
+
+    name = 'claims_api_load_test'
+
+    def run(self, args):
+        parser = argparse.ArgumentParser(
+            prog=f'{sys.argv[0].split("/")[-1]} {self.name}',
+            description=self.__doc__,
+        )
+        parser.add_argument('--url', default='http://localhost:8069', help='URL base del servidor')
+        parser.add_argument('--api-key', required=True, help="Clau d'API de l'usuari client")
+        parser.add_argument('--mode', choices=['status', 'messages'], default='status',
+                            help='Consultes d\'estat o alta de missatges en lot')
+        parser.add_argument('--references', required=True, help='Referències de reclamació separades per comes')
+        parser.add_argument('--requests', type=int, default=1000, help='Nombre total de peticions')
+        parser.add_argument('--concurrency', type=int, default=8, help='Peticions simultànies')
+        parser.add_argument('--batch-size', type=int, default=50, help='Missatges per petició (mode messages)')
+        parser.add_argument('--conditional', action='store_true',
+                            help="Reenviar l'ETag rebut (If-None-Match) en les consultes d'estat")
+        opts = parser.parse_args(args)
+
+        references = [reference.strip() for reference in opts.references.split(',') if reference.strip()]
+        etags = {}
+
+        def build_request():
+            headers = {'Authorization': f'Bearer {opts.api_key}'}
+            if opts.mode == 'status':
+                query = urllib.parse.urlencode({'references': ','.join(references)})
+                if opts.conditional and etags.get('last'):
+                    headers['If-None-Match'] = etags['last']
+                return urllib.request.Request(f'{opts.url}/custom_claims/api/claims/status?{query}', headers=headers)
+            messages = [{
+                'claim': references[i % len(references)],
+                'content': f'Missatge de prova de càrrega {i}',
+            } for i in range(opts.batch_size)]
+            headers['Content-Type'] = 'application/json'
+            return urllib.request.Request(
+                f'{opts.url}/custom_claims/api/claims',
+                data=json.dumps({'messages': messages}).encode(),
+                headers=headers,
+                method='POST',
+            )
+
+        def send(_index):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(build_request()) as response:
+                    response.read()
+                    if response.headers.get('ETag'):
+                        etags['last'] = response.headers['ETag']
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except urllib.error.URLError:
+                status = 0
+            return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts.concurrency) as executor:
+            results = list(executor.map(send, range(opts.requests)))
+        elapsed = time.perf_counter() - start
+
+        by_status = {}
+        for status, _latency in results:
+            by_status[status] = by_status.get(status, 0) + 1
+        latencies = sorted(latency for _status, latency in results)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        items = opts.batch_size if opts.mode == 'messages' else len(references)
+        print(f"Peticions: {len(results)}  temps: {elapsed:.1f}s  ({len(results) / elapsed:.0f} peticions/s, "
+              f"{len(results) * items / elapsed:.0f} elements/s)")
+        print(f"Latència p50: {quantiles[49] * 1000:.1f} ms  p95: {quantiles[94] * 1000:.1f} ms  "
+              f"p99: {quantiles[98] * 1000:.1f} ms")
+        print("Respostes: " + '  '.join(f'{status or "error"}: {count}' for status, count in sorted(by_status.items())))
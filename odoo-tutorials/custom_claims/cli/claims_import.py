@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+
+import odoo
+from odoo.cli import Command
+
+
+class ClaimsImport(Command):
+    """Importa reclamacions des d'un fitxer CSV o JSON Lines"""
+
+    name = 'claims_import'
+
+    def run(self, args):
+        parser = argparse.ArgumentParser(
+            prog=f'{sys.argv[0].split("/")[-1]} {self.name}',
+            description=self.__doc__,
+        )
+        parser.add_argument('-c', '--config', help="Fitxer de configuració d'Odoo")
+        parser.add_argument('-d', '--database', required=True, help='Base de dades')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Format del fitxer (per defecte, segons l\'extensió)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Files per bloc i per commit')
+        parser.add_argument('file', help='Fitxer a importar')
+        opts = parser.parse_args(args)
+
+        config_args = ['-d', opts.database]
+        if opts.config:
+            config_args += ['-c', opts.config]
+        odoo.tools.config.parse_config(config_args)
+
+        file_format = opts.format or ('jsonl' if opts.file.endswith(('.jsonl', '.json')) else 'csv')
+        registry = odoo.modules.registry.Registry(opts.database)
+        with registry.cursor() as cr, open(opts.file, encoding='utf-8-sig', newline='') as stream:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            stats = env['custom.claim.import']._import_stream(
+                stream, file_format, chunk_size=opts.chunk_size, auto_commit=True)
+
+        print(f"Files: {stats['rows']}  creades: {stats['created']}  errors: {stats['error_count']}  "
+              f"temps: {stats['seconds']:.1f}s  ({stats['rows_per_second']:.0f} files/s)")
+        for row_number, error in stats['errors']:
+            print(f'Fila {row_number}: {error}', file=sys.stderr)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import json
+import math
+import threading
+import time
+
+from werkzeug.http import http_date, parse_date
+
+from odoo import http
+from odoo.exceptions import AccessError, UserError
+from odoo.http import request
+
+
+# Cubells de testimonis per client (base de dades, usuari de la clau d'API).
+# Són per procés: amb diversos treballadors, el límit efectiu és per treballador
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def take_token(key, rate, burst):
+    """Consumeix un testimoni del cubell del client.
+
+    Retorna 0 si la petició es pot atendre o, si no, els segons que cal
+    esperar fins que hi hagi un testimoni disponible.
+    """
+    now = time.monotonic()
+    with _buckets_lock:
+        tokens, last = _buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1:
+            _buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+        _buckets[key] = (tokens - 1, now)
+        return 0
+
+
+class ClaimApiController(http.Controller):
+
+    def _json_response(self, data, status=200, headers=None):
+        return request.make_json_response(data, headers=headers, status=status)
+
+    # Límit de peticions per client: `custom_claims.api_rate_limit` peticions
+    # per segon amb ràfegues de fins a `custom_claims.api_burst`
+    def _rate_limited(self):
+        ICP = request.env['ir.config_parameter'].sudo()
+        rate = float(ICP.get_param('custom_claims.api_rate_limit', 10))
+        burst = float(ICP.get_param('custom_claims.api_burst', 20))
+        wait = take_token((request.db, request.env.uid), rate, burst)
+        if not wait:
+            return None
+        return self._json_response(
+            {'error': 'Massa peticions'}, status=429, headers=[('Retry-After', str(math.ceil(wait)))])
+
+    # Alta en lot de reclamacions i missatges:
+    # {"claims": [{"subject", "description", "sale_order", ...}], "messages": [{"claim", "content"}]}
+    @http.route('/custom_claims/api/claims', type='http', auth='bearer', methods=['POST'], csrf=False, save_session=False)
+    def intake(self, **kwargs):
+        limited = self._rate_limited()
+        if limited:
+            return limited
+        try:
+            payload = json.loads(request.httprequest.get_data() or b'{}')
+        except ValueError:
+            return self._json_response({'error': 'JSON invàlid'}, status=400)
+        if not isinstance(payload, dict):
+            return self._json_response({'error': 'Cal un objecte JSON'}, status=400)
+        try:
+            result = request.env['custom.claim.api']._intake(
+                payload.get('claims') or [], payload.get('messages') or [])
+        except (UserError, AccessError) as e:
+            return self._json_response({'error': str(e)}, status=403 if isinstance(e, AccessError) else 400)
+        return self._json_response(result)
+
+    # Estat de moltes reclamacions: ?references=REC001,REC002,...
+    # Respon 304 si el client ja té la versió actual (If-None-Match o
+    # If-Modified-Since), sense llegir les reclamacions
+    @http.route('/custom_claims/api/claims/status', type='http', auth='bearer', methods=['GET'], save_session=False)
+    def status(self, references='', **kwargs):
+        limited = self._rate_limited()
+        if limited:
+            return limited
+        references = [reference.strip() for reference in references.split(',') if reference.strip()]
+        Api = request.env['custom.claim.api']
+        try:
+            etag, last_modified = Api._status_validator(references)
+        except UserError as e:
+            return self._json_response({'error': str(e)}, status=400)
+        headers = [('ETag', etag), ('Cache-Control', 'private, no-cache')]
+        if last_modified:
+            headers.append(('Last-Modified', http_date(last_modified)))
+
+        httprequest = request.httprequest
+        if httprequest.headers.get('If-None-Match'):
+            not_modified = etag in [tag.strip() for tag in httprequest.headers['If-None-Match'].split(',')]
+        else:
+            since = parse_date(httprequest.headers.get('If-Modified-Since'))
+            # La capçalera HTTP té resolució de segons
+            not_modified = bool(since and last_modified and last_modified.replace(microsecond=0) <= since.replace(tzinfo=None))
+        if not_modified:
+            return request.make_response('', headers=headers, status=304)
+        return self._json_response(Api._status(references), headers=headers)
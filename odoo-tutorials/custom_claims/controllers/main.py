@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import hmac
+
+from odoo import http, tools
+from odoo.http import request
+
+
+class ClaimMetricsController(http.Controller):
+
+    # Accés a les mètriques: cal el testimoni compartit del paràmetre
+    # `custom_claims.metrics_token` a la capçalera `Authorization: Bearer` i,
+    # si s'ha configurat `custom_claims.metrics_allowed_ips` (adreces separades
+    # per comes), que l'adreça del client hi sigui. Darrere d'un servidor
+    # intermediari l'adreça només és fiable amb --proxy-mode; la ruta també
+    # es pot bloquejar directament al servidor intermediari
+    def _metrics_allowed(self, env):
+        ICP = env['ir.config_parameter']
+        token = ICP.get_param('custom_claims.metrics_token')
+        if not token:
+            return False
+        allowed_ips = ICP.get_param('custom_claims.metrics_allowed_ips')
+        if allowed_ips and request.httprequest.remote_addr not in {
+                address.strip() for address in allowed_ips.split(',')}:
+            return False
+        scheme, _sep, provided = request.httprequest.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(provided.strip().encode(), token.encode())
+
+    # Mètriques de rendiment en format Prometheus, si el paràmetre
+    # `custom_claims.perf_prometheus` està activat i la petició està autoritzada
+    @http.route('/custom_claims/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self, **kwargs):
+        if not request.db:
+            return request.not_found()
+        env = request.env(su=True)
+        if not tools.str2bool(env['ir.config_parameter'].get_param('custom_claims.perf_prometheus', 'False')):
+            return request.not_found()
+        if not self._metrics_allowed(env):
+            return request.not_found()
+        return request.make_response(
+            env['custom.claim.perf.stat']._prometheus_text(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
@@ -2,3 +2,18 @@ from . import claim
 from . import closure_reason
 from . import claim_message
 from . import sale_order
+from . import ir_sequence
+from . import ir_config_parameter
+from . import res_company
+from . import claim_notification
+from . import claim_audit
+from . import claim_checkpoint
+from . import claim_archive
+# La vista materialitzada de l'informe llegeix la taula de l'arxiu
+from . import claim_report
+from . import claim_cancel_job
+from . import res_partner
+from . import claim_perf
+from . import claim_api
+from . import account_move
+from . import stock_picking
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+from odoo.tools import SQL
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    # Comandes de venda facturades per aquests assentaments
+    def _claim_order_query(self):
+        self.env['account.move.line'].flush_model(['move_id', 'sale_line_ids'])
+        return SQL(
+            """
+            SELECT sol.order_id
+              FROM account_move_line aml
+              JOIN sale_order_line_invoice_rel rel ON rel.invoice_line_id = aml.id
+              JOIN sale_order_line sol ON sol.id = rel.order_line_id
+             WHERE aml.move_id = ANY(%s)
+            """,
+            self.ids,
+        )
+
+    # Mantenir els comptadors emmagatzemats de les reclamacions. Si el mode
+    # emmagatzemat està desactivat no es buida res ni es consulta res
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super().create(vals_list)
+        Claim = self.env['custom.claim']
+        if Claim._use_stored_invoice_shipment():
+            Claim._mark_invoice_shipment_to_recompute(moves._claim_order_query())
+        return moves
+
+    def write(self, vals):
+        res = super().write(vals)
+        Claim = self.env['custom.claim']
+        if {'state', 'move_type', 'invoice_line_ids', 'line_ids'} & vals.keys() and Claim._use_stored_invoice_shipment():
+            Claim._mark_invoice_shipment_to_recompute(self._claim_order_query())
+        return res
+
+    def unlink(self):
+        Claim = self.env['custom.claim']
+        if not Claim._use_stored_invoice_shipment():
+            return super().unlink()
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT order_id FROM (%s) orders", self._claim_order_query()))
+        order_ids = [row[0] for row in self.env.cr.fetchall()]
+        res = super().unlink()
+        if order_ids:
+            Claim._mark_invoice_shipment_to_recompute(SQL("SELECT unnest(%s::int[])", order_ids))
+        return res
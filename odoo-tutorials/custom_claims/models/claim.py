@@ -1,8 +1,18 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, exceptions, _
+from odoo import models, fields, api, exceptions, tools, Command, _
 from odoo.exceptions import UserError
-from datetime import datetime
+from odoo.osv import expression
+from odoo.tools import SQL
+from odoo.tools.query import Query
+from collections import Counter
+from datetime import datetime, timedelta
+import logging
+import time
+
+from .claim_perf import profiled
+
+_logger = logging.getLogger(__name__)
 
 class Claim(models.Model):
     # Nom del model a Odoo
@@ -13,6 +23,8 @@ class Claim(models.Model):
     _inherit = ['mail.thread', 'mail.activity.mixin']
     # Ordenar les reclamacions per data de creació descendent
     _order = 'create_date desc'
+    # Configuració de cerca de text de PostgreSQL per a cada idioma
+    _text_search_configs = {'ca': 'catalan', 'es': 'spanish', 'en': 'english'}
 
     # Camp per a la referència de la reclamació
     name = fields.Char(
@@ -57,7 +69,18 @@ class Claim(models.Model):
         string='Client',
         related='sale_order_id.partner_id',  # Relacionat amb el client de la comanda
         store=True,  # S'emmagatzema a la base de dades
-        readonly=True  # Només de lectura
+        readonly=True,  # Només de lectura
+        index=True  # Cerques i agrupacions per client
+    )
+    # Entitat comercial del client: els comptadors per client s'agreguen per
+    # empresa, també quan la comanda és d'un dels seus contactes
+    commercial_partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Empresa client',
+        related='partner_id.commercial_partner_id',
+        store=True,
+        readonly=True,
+        index=True
     )
     # Relació amb l'usuari responsable de la reclamació
     user_id = fields.Many2one(
@@ -88,6 +111,14 @@ class Claim(models.Model):
         string='Missatges',
         copy=False  # No es copien en duplicar la reclamació
     )
+    # Últims missatges del fil, per no llegir tot el fil en obrir el formulari
+    recent_message_ids = fields.Many2many(
+        comodel_name='custom.claim.message',
+        string='Missatges recents',
+        compute='_compute_recent_message_ids'
+    )
+    # Indica si hi ha missatges més antics que els mostrats
+    has_older_messages = fields.Boolean(compute='_compute_recent_message_ids')
     # Nombre de factures associades a la comanda
     invoice_count = fields.Integer(
         string='Factures',
@@ -98,6 +129,19 @@ class Claim(models.Model):
         string='Enviaments',
         compute='_compute_invoice_shipment'  # Calculat automàticament
     )
+    # Còpia emmagatzemada dels comptadors, mantinguda quan canvia l'estat de
+    # les factures i els enviaments; la fan servir els comptadors anteriors si
+    # el paràmetre `custom_claims.stored_invoice_shipment` està activat
+    stored_invoice_count = fields.Integer(
+        string='Factures (emmagatzemat)',
+        compute='_compute_stored_invoice_shipment',
+        store=True
+    )
+    stored_shipment_count = fields.Integer(
+        string='Enviaments (emmagatzemat)',
+        compute='_compute_stored_invoice_shipment',
+        store=True
+    )
     # Descripció de la resolució final de la reclamació
     resolution = fields.Text(
         string='Resolució final',
@@ -110,15 +154,257 @@ class Claim(models.Model):
         tracking=True  # Es rastreja per a historial de canvis
     )
 
+    # Data d'entrada a l'estat actual, punt de partida de l'SLA
+    state_date = fields.Datetime(
+        string="Data de l'estat",
+        compute='_compute_state_date',
+        store=True,
+        readonly=True,
+        copy=False
+    )
+    # Data límit de l'SLA de l'estat obert actual (buida si està tancada)
+    sla_deadline = fields.Datetime(
+        string='Límit SLA',
+        compute='_compute_sla_deadline',
+        store=True,
+        readonly=True
+    )
+    # Oberta amb el límit de l'SLA ja superat, respecte de l'hora actual
+    sla_overdue = fields.Boolean(
+        string="Fora d'SLA",
+        compute='_compute_sla_overdue',
+        search='_search_sla_overdue'
+    )
+    # Marcada pel cron d'escalat quan s'ha superat el límit de l'SLA
+    escalated = fields.Boolean(
+        string='Escalada',
+        readonly=True,
+        copy=False
+    )
+
+    # Reclamacions semblants del mateix client, trobades per similitud de trigrames
+    duplicate_candidate_ids = fields.Many2many(
+        comodel_name='custom.claim',
+        relation='custom_claim_duplicate_rel',
+        column1='claim_id',
+        column2='candidate_id',
+        string='Possibles duplicats',
+        readonly=True,
+        copy=False
+    )
+    # Indica si ja s'han cercat duplicats (les pendents les revisa el cron)
+    duplicate_checked = fields.Boolean(
+        string='Duplicats revisats',
+        readonly=True,
+        copy=False
+    )
+
+    # Cerca de text complet sobre l'assumpte, la descripció i els missatges
+    text_search = fields.Char(
+        string='Text',
+        compute='_compute_text_search',
+        search='_search_text_search'
+    )
+
+    # Nombre de missatges per pàgina del formulari
+    _recent_message_step = 20
+
+    # Pàgina de missatges del formulari: els més recents o, amb el cursor
+    # (create_date, id) de custom.claim.message.read_page a la clau de context
+    # claim_message_before, la pàgina anterior a aquest cursor
+    @api.depends_context('claim_message_before')
+    def _compute_recent_message_ids(self):
+        before = self.env.context.get('claim_message_before')
+        Message = self.env['custom.claim.message']
+        for record in self:
+            messages, has_more = Message._search_page(
+                record._origin.id, before=before, limit=self._recent_message_step) if record._origin else (Message, False)
+            record.recent_message_ids = messages
+            record.has_older_messages = has_more
+
+    # Tornar a obrir el formulari amb la pàgina següent de missatges anteriors
+    def action_load_older_messages(self):
+        self.ensure_one()
+        page = self.env['custom.claim.message'].read_page(
+            self.id, before=self.env.context.get('claim_message_before'), limit=self._recent_message_step)
+        if not page['next_cursor']:
+            return False
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+            'context': dict(self.env.context, claim_message_before=page['next_cursor']),
+        }
+
+    # Llista paginada de tot el fil, on també s'afegeixen missatges nous
+    def action_view_messages(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Missatges'),
+            'res_model': 'custom.claim.message',
+            'view_mode': 'list',
+            'domain': [('claim_id', '=', self.id)],
+            'context': {'default_claim_id': self.id},
+        }
+
     # Mètode per calcular el nombre de factures i enviaments associats
-    @api.depends('sale_order_id.invoice_ids', 'sale_order_id.picking_ids')
+    @api.depends('sale_order_id.invoice_ids.state', 'sale_order_id.picking_ids.state')
+    @profiled('custom.claim._compute_invoice_shipment')
     def _compute_invoice_shipment(self):
+        if self._use_stored_invoice_shipment():
+            # Mode emmagatzemat: només es llegeixen les columnes de la reclamació
+            for record in self:
+                record.invoice_count = record.stored_invoice_count
+                record.shipment_count = record.stored_shipment_count
+            return
+        # Es calcula per a tot el conjunt amb consultes agrupades, sense
+        # carregar les factures i els enviaments de cada comanda a la memòria cau
+        orders = self.sale_order_id._origin
+        invoice_counts = self._get_invoice_counts(orders)
+        shipment_counts = self._get_shipment_counts(orders)
+        for record in self:
+            order_id = record.sale_order_id._origin.id
+            record.invoice_count = invoice_counts.get(order_id, 0)
+            record.shipment_count = shipment_counts.get(order_id, 0)
+
+    @api.model
+    def _use_stored_invoice_shipment(self):
+        return tools.str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'custom_claims.stored_invoice_shipment', 'False'))
+
+    # Les columnes emmagatzemades es recalculen per lots: en crear la
+    # reclamació o canviar-ne la comanda, i des dels ganxos d'account.move,
+    # stock.picking i stock.move (vegeu _mark_invoice_shipment_to_recompute)
+    @api.depends('sale_order_id')
+    def _compute_stored_invoice_shipment(self):
+        orders = self.sale_order_id._origin
+        invoice_counts = self._get_invoice_counts(orders)
+        shipment_counts = self._get_shipment_counts(orders)
+        for record in self:
+            order_id = record.sale_order_id._origin.id
+            record.stored_invoice_count = invoice_counts.get(order_id, 0)
+            record.stored_shipment_count = shipment_counts.get(order_id, 0)
+
+    # Programar el recàlcul dels comptadors emmagatzemats de les reclamacions
+    # de les comandes indicades (subconsulta SQL que retorna ids de sale_order)
+    @api.model
+    def _mark_invoice_shipment_to_recompute(self, order_query):
+        self.flush_model(['sale_order_id'])
+        self.env.cr.execute(SQL(
+            "SELECT id FROM custom_claim WHERE sale_order_id IN (%s)", order_query))
+        claims = self.sudo().browse(row[0] for row in self.env.cr.fetchall())
+        if claims:
+            for fname in ('stored_invoice_count', 'stored_shipment_count'):
+                self.env.add_to_compute(self._fields[fname], claims)
+
+    # Comptar factures de client no cancel·lades per comanda en una sola consulta
+    @api.model
+    def _get_invoice_counts(self, orders):
+        if not orders:
+            return {}
+        self.env['account.move'].flush_model(['state', 'move_type'])
+        self.env['account.move.line'].flush_model(['move_id'])
+        self.env['sale.order.line'].flush_model(['order_id', 'invoice_lines'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT sol.order_id, COUNT(DISTINCT move.id)
+              FROM sale_order_line sol
+              JOIN sale_order_line_invoice_rel rel ON rel.order_line_id = sol.id
+              JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+              JOIN account_move move ON move.id = aml.move_id
+             WHERE sol.order_id = ANY(%s)
+               AND move.state != 'cancel'
+               AND move.move_type IN ('out_invoice', 'out_refund')
+          GROUP BY sol.order_id
+            """,
+            orders.ids,
+        ))
+        return dict(self.env.cr.fetchall())
+
+    # Comptar enviaments no cancel·lats per comanda en una sola consulta
+    @api.model
+    def _get_shipment_counts(self, orders):
+        if not orders:
+            return {}
+        groups = self.env['stock.picking']._read_group(
+            [('sale_id', 'in', orders.ids), ('state', '!=', 'cancel')],
+            ['sale_id'],
+            ['__count'],
+        )
+        return {order.id: count for order, count in groups}
+
+    # Totals, obertes i última data per comanda o client, amb una consulta per
+    # a les reclamacions vives i una altra per a les arxivades (sempre tancades)
+    @api.model
+    def _get_claim_stats(self, field_name, ids):
+        if not ids:
+            return {}
+        groups = self.sudo()._read_group(
+            [(field_name, 'in', ids)],
+            [field_name, 'state'],
+            ['__count', 'create_date:max'],
+        )
+        stats = {}
+        for record, state, count, last_date in groups:
+            total, open_count, last = stats.get(record.id, (0, 0, False))
+            stats[record.id] = (
+                total + count,
+                open_count + (count if state in ('new', 'in_progress') else 0),
+                max(last, last_date) if last and last_date else last or last_date,
+            )
+        archived = self.env['custom.claim.archive'].sudo()._read_group(
+            [(field_name, 'in', ids)],
+            [field_name],
+            ['__count', 'claim_create_date:max'],
+        )
+        for record, count, last_date in archived:
+            total, open_count, last = stats.get(record.id, (0, 0, False))
+            stats[record.id] = (
+                total + count,
+                open_count,
+                max(last, last_date) if last and last_date else last or last_date,
+            )
+        return stats
+
+    # Hores de l'SLA per estat obert (paràmetres del sistema)
+    @api.model
+    def _get_sla_hours(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'new': float(ICP.get_param('custom_claims.sla_new_hours', 24)),
+            'in_progress': float(ICP.get_param('custom_claims.sla_in_progress_hours', 72)),
+        }
+
+    # Cada canvi d'estat (també la reobertura) torna a començar el termini
+    @api.depends('state')
+    def _compute_state_date(self):
+        self.state_date = fields.Datetime.now()
+
+    @api.depends('state', 'state_date')
+    def _compute_sla_deadline(self):
+        hours = self._get_sla_hours()
+        now = fields.Datetime.now()
         for record in self:
-            # Comptar factures no cancel·lades
-            record.invoice_count = len(record.sale_order_id.invoice_ids.filtered(lambda i: i.state != 'cancel')) if record.sale_order_id else 0
-            # Comptar enviaments no cancel·lats
-            record.shipment_count = len(record.sale_order_id.picking_ids.filtered(lambda p: p.state != 'cancel')) if record.sale_order_id else 0
-    
+            if record.state in hours:
+                record.sla_deadline = (record.state_date or now) + timedelta(hours=hours[record.state])
+            else:
+                record.sla_deadline = False
+
+    def _compute_sla_overdue(self):
+        now = fields.Datetime.now()
+        for record in self:
+            record.sla_overdue = bool(record.sla_deadline) and record.sla_deadline <= now
+
+    # Mateix criteri que el cron d'escalat (sla_deadline <= ara), no la mitjanit
+    def _search_sla_overdue(self, operator, value):
+        if operator not in ('=', '!=') or not isinstance(value, bool):
+            raise UserError(_('Operació de cerca no suportada.'))
+        domain = [('state', 'in', self._open_states), ('sla_deadline', '<=', fields.Datetime.now())]
+        return domain if (operator == '=') == value else ['!'] + expression.normalize_domain(domain)
+
     # Mètode per canviar l'estat a "En tractament" si hi ha missatges
     @api.depends('message_ids')  # <-- Asegúrate de que está decorado
     def _compute_state_based_on_messages(self):
@@ -129,135 +415,574 @@ class Claim(models.Model):
 
     # Mètode per generar una seqüència única per a la referència de la reclamació
     @api.model_create_multi
+    @profiled('custom.claim.create')
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('Nova')) == _('Nova'):
-                seq = self.env['ir.sequence'].next_by_code('custom.claim')
-                vals['name'] = seq or _('Nova')
-                if not seq:
-                    raise exceptions.ValidationError(_('Error en la secuencia'))
-        return super().create(vals_list)
-
-    # Restricció per evitar dues reclamacions obertes per la mateixa comanda
-    @api.constrains('sale_order_id', 'state')
-    def _check_open_claims(self):
-        for record in self:
-            if record.state in ['new', 'in_progress']:
-                existing = self.search([
-                    ('sale_order_id', '=', record.sale_order_id.id),
-                    ('state', 'in', ('new', 'in_progress')),
-                    ('id', '!=', record.id)
-                ], limit=1)
-                if existing:
-                    raise exceptions.ValidationError(
-                        _('Ja existeix una reclamació activa per la comanda %s') % record.sale_order_id.name)
-                    
-    # Mètode per tancar una reclamació
-    def action_close(self):
-        for record in self:
-            if record.state in ['closed', 'canceled']:
-                raise UserError(_('La reclamació ja està tancada o cancel·lada.'))
-            
-            record.write({
-                'state': 'closed',
-                'close_date': fields.Datetime.now(),
-            })
-            # Mensaje en el chatter
-            record.message_post(
-                body="✅ La reclamació ha estat tancada.",
+        # Mode en bloc: sense seguiment, seguidors ni missatges de creació per
+        # registre, només una entrada d'auditoria per a tot el lot
+        bulk_mode = self.env.context.get('claim_bulk_mode')
+        if bulk_mode:
+            self = self.with_context(tracking_disable=True)
+        # Comprovar les reclamacions obertes abans de l'INSERT, perquè l'usuari
+        # rebi la llista de comandes en conflicte i no l'error de l'índex únic
+        default_state = self.default_get(['state']).get('state')
+        self._check_open_claim_orders([
+            vals.get('sale_order_id') for vals in vals_list
+            if vals.get('state', default_state) in self._open_states and vals.get('sale_order_id')
+        ])
+        default_name = _('Nova')
+        to_number = [vals for vals in vals_list if vals.get('name', default_name) == default_name]
+        if to_number:
+            sequence = self.env['ir.sequence']
+            if self.env.company.claim_sequence_block:
+                # Es reserva tot el bloc de números amb una sola sentència
+                names = sequence._next_block_by_code('custom.claim', len(to_number))
+            else:
+                names = [sequence.next_by_code('custom.claim') for _vals in to_number]
+            if len(names) != len(to_number) or not all(names):
+                raise exceptions.ValidationError(_('Error en la secuencia'))
+            for vals, name in zip(to_number, names):
+                vals['name'] = name
+        claims = super().create(vals_list)
+        # Les creacions en bloc (importacions, restauracions) les revisa el cron
+        if not bulk_mode:
+            claims._detect_duplicates()
+        if bulk_mode:
+            self.env['custom.claim.audit']._log_batch(
+                self.env.context.get('claim_bulk_operation', 'create'), claims)
+        return claims
+
+    # En mode en bloc (clau de context claim_bulk_mode) no es generen valors de
+    # seguiment ni missatges per registre i camp, ni s'hi subscriu ni es notifica
+    # el nou responsable: es desa una sola entrada a custom.claim.audit amb els
+    # identificadors i el resum de valors antics i nous
+    def write(self, vals):
+        if {'state', 'sale_order_id'} & vals.keys():
+            # Mateixa comprovació prèvia que a create, abans que s'escrigui res
+            will_open = self if vals.get('state') in self._open_states else (
+                self.env['custom.claim'] if 'state' in vals else self.filtered(lambda c: c.state in self._open_states))
+            self._check_open_claim_orders(
+                [vals.get('sale_order_id') or claim.sale_order_id.id for claim in will_open],
+                excluded_ids=self.ids,
+            )
+        if {'subject', 'description'} & vals.keys():
+            # El text ha canviat: el cron tornarà a cercar-ne els duplicats
+            vals = dict(vals, duplicate_checked=False)
+        if not self.env.context.get('claim_bulk_mode') or not self:
+            return super().write(vals)
+        tracked_fields = self._track_get_fields()
+        tracked = [fname for fname in vals if fname in tracked_fields]
+        Audit = self.env['custom.claim.audit']
+        old_values = Audit._summarize_values(self, tracked) if tracked else {}
+        result = super(Claim, self.with_context(tracking_disable=True)).write(vals)
+        Audit._log_batch(
+            self.env.context.get('claim_bulk_operation', 'write'),
+            self,
+            {fname: {'old': old_values[fname], 'new': vals[fname]} for fname in tracked},
+        )
+        return result
+
+    # En actualitzar una base de dades existent, la data de l'estat i la data
+    # límit de l'SLA es calculen amb sentències directes en lloc de recórrer les
+    # reclamacions amb l'ORM. Per a les que ja estaven en tractament, la millor
+    # aproximació de l'entrada a l'estat és la darrera modificació
+    def _auto_init(self):
+        cr = self.env.cr
+        if tools.table_exists(cr, self._table) and not tools.column_exists(cr, self._table, 'state_date'):
+            tools.create_column(cr, self._table, 'state_date', 'timestamp')
+            if not tools.column_exists(cr, self._table, 'sla_deadline'):
+                tools.create_column(cr, self._table, 'sla_deadline', 'timestamp')
+            table = SQL.identifier(self._table)
+            cr.execute(SQL(
+                """
+                UPDATE %(table)s
+                   SET state_date = CASE state
+                           WHEN 'new' THEN create_date
+                           ELSE COALESCE(write_date, create_date)
+                       END
+                """,
+                table=table,
+            ))
+            hours = self._get_sla_hours()
+            cr.execute(SQL(
+                """
+                UPDATE %(table)s
+                   SET sla_deadline = state_date + CASE state
+                           WHEN 'new' THEN %(new_hours)s
+                           ELSE %(in_progress_hours)s
+                       END * interval '1 hour'
+                 WHERE state IN ('new', 'in_progress')
+                """,
+                table=table,
+                new_hours=hours['new'],
+                in_progress_hours=hours['in_progress'],
+            ))
+        return super()._auto_init()
+
+    # Índexs de la taula de reclamacions
+    def init(self):
+        super().init()
+        # Índex únic parcial que garanteix a nivell de base de dades una sola
+        # reclamació oberta per comanda, també amb diversos treballadors concurrents
+        tools.create_index(
+            self.env.cr,
+            'custom_claim_open_sale_order_uniq',
+            self._table,
+            ['sale_order_id'],
+            where="state IN ('new', 'in_progress')",
+            unique=True,
+        )
+        # Índexs compostos per als accessos reals: la regla de registre per
+        # responsable i el filtre per estat, tots dos amb l'ordre per defecte
+        # (create_date desc), i la cerca de reclamacions d'una comanda per estat
+        for index_name, expressions in (
+            ('custom_claim_user_id_create_date_idx', ['user_id', 'create_date DESC']),
+            ('custom_claim_state_create_date_idx', ['state', 'create_date DESC']),
+            ('custom_claim_sale_order_id_state_idx', ['sale_order_id', 'state']),
+        ):
+            tools.create_index(self.env.cr, index_name, self._table, expressions)
+        # Índex parcial de les reclamacions pendents de revisar duplicats
+        tools.create_index(
+            self.env.cr,
+            'custom_claim_duplicate_pending_idx',
+            self._table,
+            ['id'],
+            where="duplicate_checked IS NOT TRUE",
+        )
+        # Índex parcial del cron d'escalat: només reclamacions obertes pendents
+        # d'escalar, en l'ordre del recorregut per lots (sla_deadline, id)
+        tools.create_index(
+            self.env.cr,
+            'custom_claim_sla_deadline_idx',
+            self._table,
+            ['sla_deadline', 'id'],
+            where="state IN ('new', 'in_progress') AND escalated IS NOT TRUE",
+        )
+        # Índexs de cerca de text: un GIN de tsvector per configuració d'idioma
+        # i, si pg_trgm està disponible, GIN de trigrames per a cerques parcials
+        for config in self._get_available_text_search_configs():
+            tools.create_index(
+                self.env.cr,
+                f'custom_claim_text_search_{config}_idx',
+                self._table,
+                [f"to_tsvector('{config}'::regconfig, COALESCE(subject, '') || ' ' || COALESCE(description, ''))"],
+                method='gin',
+            )
+        if self.env.registry.has_trigram:
+            for column in ('subject', 'description'):
+                tools.create_index(
+                    self.env.cr,
+                    f'custom_claim_{column}_trgm_idx',
+                    self._table,
+                    [f'{column} gin_trgm_ops'],
+                    method='gin',
+                )
+
+    # Configuracions de cerca de text instal·lades a PostgreSQL (el català
+    # només existeix a partir de PostgreSQL 16)
+    @api.model
+    @tools.ormcache()
+    def _get_available_text_search_configs(self):
+        self.env.cr.execute(
+            "SELECT cfgname FROM pg_ts_config WHERE cfgname = ANY(%s) ORDER BY cfgname",
+            [list(self._text_search_configs.values())],
+        )
+        return tuple(row[0] for row in self.env.cr.fetchall())
+
+    # Configuració de cerca de text segons l'idioma de l'usuari
+    @api.model
+    def _get_text_search_config(self):
+        lang = (self.env.lang or 'en_US').split('_')[0]
+        config = self._text_search_configs.get(lang, 'english')
+        return config if config in self._get_available_text_search_configs() else 'english'
+
+    # Expressió tsvector idèntica a la dels índexs perquè PostgreSQL els utilitzi
+    @api.model
+    def _text_search_vector(self, config, alias):
+        return SQL(
+            "to_tsvector(%s::regconfig, COALESCE(%s, '') || ' ' || COALESCE(%s, ''))",
+            config, SQL.identifier(alias, 'subject'), SQL.identifier(alias, 'description'),
+        )
+
+    def _compute_text_search(self):
+        self.text_search = False
+
+    def _search_text_search(self, operator, value):
+        if operator not in ('ilike', 'like', '=') or not isinstance(value, str) or not value.strip():
+            raise UserError(_('Operació de cerca de text no suportada.'))
+        config = self._get_text_search_config()
+        self.flush_model(['subject', 'description'])
+        self.env['custom.claim.message'].flush_model(['claim_id', 'content'])
+        # Cada branca de la unió es resol amb els índexs GIN de la seva taula.
+        # La unió es retorna com a subconsulta perquè PostgreSQL la combini amb
+        # la resta del domini, sense portar els identificadors a Python
+        union = SQL(
+            """
+            SELECT claim.id
+              FROM custom_claim claim
+             WHERE %(claim_vector)s @@ %(tsquery)s
+                OR claim.subject ILIKE %(pattern)s
+                OR claim.description ILIKE %(pattern)s
+             UNION
+            SELECT msg.claim_id
+              FROM custom_claim_message msg
+             WHERE %(message_vector)s @@ %(tsquery)s
+                OR msg.content ILIKE %(pattern)s
+            """,
+            claim_vector=self._text_search_vector(config, 'claim'),
+            message_vector=self.env['custom.claim.message']._text_search_vector(config, 'msg'),
+            tsquery=SQL("websearch_to_tsquery(%s::regconfig, %s)", config, value),
+            pattern=f'%{tools.escape_psql(value)}%',
+        )
+        return [('id', 'in', Query(self.env, 'claim_text_match', SQL("(%s)", union)))]
+
+    # Amb una cerca de text activa i sense ordre explícit, la llista es
+    # mostra ordenada per rellevància
+    @api.model
+    def web_search_read(self, domain, specification, offset=0, limit=None, order=None, count_limit=None):
+        text = next((
+            leaf[2] for leaf in domain
+            if isinstance(leaf, (list, tuple)) and leaf[0] == 'text_search' and isinstance(leaf[2], str)
+        ), None)
+        if text and not order:
+            self = self.with_context(claim_text_rank=text)
+        return super(Claim, self).web_search_read(
+            domain, specification, offset=offset, limit=limit, order=order, count_limit=count_limit)
+
+    @api.model
+    def _search(self, domain, offset=0, limit=None, order=None, **kwargs):
+        query = super()._search(domain, offset=offset, limit=limit, order=order, **kwargs)
+        text = self.env.context.get('claim_text_rank')
+        if text and query.order:
+            config = self._get_text_search_config()
+            rank = SQL(
+                "ts_rank(%s, websearch_to_tsquery(%s::regconfig, %s))",
+                self._text_search_vector(config, self._table), config, text,
+            )
+            query.order = SQL("%s DESC, %s", rank, query.order)
+        return query
+
+    # Estats en què una reclamació compta com a oberta
+    _open_states = ('new', 'in_progress')
+
+    # Evitar dues reclamacions obertes per la mateixa comanda (l'índex únic
+    # parcial ho garanteix també davant de treballadors concurrents).
+    # Comprovació prèvia a l'escriptura: comandes repetides dins del lot i
+    # comandes que ja tenen una altra reclamació oberta, amb una sola consulta
+    # agrupada i sense regles de registre (la reclamació en conflicte pot ser
+    # d'un altre responsable)
+    @api.model
+    def _check_open_claim_orders(self, order_ids, excluded_ids=()):
+        order_ids = [order_id for order_id in order_ids if order_id]
+        if not order_ids:
+            return
+        counts = Counter(order_ids)
+        conflicts = {order_id for order_id, count in counts.items() if count > 1}
+        groups = self.sudo()._read_group(
+            [
+                ('sale_order_id', 'in', list(counts)),
+                ('state', 'in', self._open_states),
+                ('id', 'not in', list(excluded_ids)),
+            ],
+            ['sale_order_id'],
+        )
+        conflicts.update(order.id for order, in groups)
+        if conflicts:
+            orders = self.env['sale.order'].sudo().browse(sorted(conflicts))
+            raise exceptions.ValidationError(
+                _('Ja existeix una reclamació activa per la comanda %s') % ', '.join(orders.mapped('name')))
+
+    # Afegir la mateixa nota al chatter de totes les reclamacions amb una sola creació
+    def _log_note_batch(self, body):
+        # En mode en bloc l'entrada d'auditoria substitueix les notes per registre
+        if self and not self.env.context.get('claim_bulk_mode'):
+            self._message_log_batch(
+                bodies={record.id: body for record in self},
                 message_type='comment',
-                subtype_xmlid='mail.mt_note'
             )
+
+    # Les accions de flux treballen sobre tot el lot: es valida abans de
+    # modificar res, s'escriu una sola vegada per estat destí i les notes del
+    # chatter es creen en bloc. Objectiu de rendiment: més de 1.000
+    # reclamacions tancades per segon sobre el conjunt de referència.
+
+    # Mètode per tancar reclamacions
+    @profiled('custom.claim.action_close')
+    def action_close(self):
+        if any(record.state in ['closed', 'canceled'] for record in self):
+            raise UserError(_('La reclamació ja està tancada o cancel·lada.'))
+
+        vals = {
+            'state': 'closed',
+            'close_date': fields.Datetime.now(),
+        }
+        # Integracions i tancaments automàtics indiquen el motiu pel codi
+        reason_code = self.env.context.get('closure_reason_code')
+        if reason_code:
+            reason_id = self.env['custom.closure.reason']._lookup_code(reason_code)
+            if not reason_id:
+                raise UserError(_('Motiu de tancament desconegut: %s', reason_code))
+            vals['closure_reason_id'] = reason_id
+        self.with_context(claim_bulk_operation='action_close').write(vals)
+        self._log_note_batch("✅ La reclamació ha estat tancada.")
         return True
-        
-    # Mètode per cancel·lar una reclamació
+
+    # Mètode per cancel·lar reclamacions
+    @profiled('custom.claim.action_cancel')
     def action_cancel(self):
-        for record in self:
-            if record.state == 'canceled':
-                raise UserError(_('La reclamació ja està cancel·lada.'))
-            
-            if record.sale_order_id.invoice_ids.filtered(lambda inv: inv.state == 'posted'):
-                raise UserError(_('No es pot cancel·lar perquè hi ha factures publicades.'))
-            
-            if record.sale_order_id:
-                record.sale_order_id.action_cancel()
-                invoices_to_cancel = record.sale_order_id.invoice_ids.filtered(lambda inv: inv.state != 'posted')
-                invoices_to_cancel.button_cancel()
-                pickings_to_cancel = record.sale_order_id.picking_ids.filtered(lambda p: p.state != 'done')
-                pickings_to_cancel.action_cancel()
-            
-            record.write({
-                'state': 'canceled',
-                'close_date': fields.Datetime.now(),
-            })
-            # Mensaje en el chatter
-            record.message_post(
-                body="❌ La reclamació ha estat cancel·lada.",
-                message_type='comment',
-                subtype_xmlid='mail.mt_note'
-            )
+        if any(record.state == 'canceled' for record in self):
+            raise UserError(_('La reclamació ja està cancel·lada.'))
+
+        orders = self.sale_order_id
+        if orders.invoice_ids.filtered(lambda inv: inv.state == 'posted'):
+            raise UserError(_('No es pot cancel·lar perquè hi ha factures publicades.'))
+
+        if orders:
+            orders.action_cancel()
+            invoices_to_cancel = orders.invoice_ids.filtered(lambda inv: inv.state != 'posted')
+            invoices_to_cancel.button_cancel()
+            pickings_to_cancel = orders.picking_ids.filtered(lambda p: p.state != 'done')
+            pickings_to_cancel.action_cancel()
+
+        self.with_context(claim_bulk_operation='action_cancel').write({
+            'state': 'canceled',
+            'close_date': fields.Datetime.now(),
+        })
+        self._log_note_batch("❌ La reclamació ha estat cancel·lada.")
         return True
-    
-    # Mètode per reobrir una reclamació
+
+    # Mètode per reobrir reclamacions
+    @profiled('custom.claim.action_reopen')
     def action_reopen(self):
-        for record in self:
-            if record.state not in ['closed', 'canceled']:
-                raise UserError(_('Només es poden reobrir reclamacions tancades o cancel·lades.'))
-            
-            new_state = 'in_progress' if record.message_ids else 'new'
-            record.write({
-                'state': new_state,
-                'close_date': False,
-            })
-            # Mensaje en el chatter
-            record.message_post(
-                body="🔄 La reclamació ha estat reoberta.",
-                message_type='comment',
-                subtype_xmlid='mail.mt_note'
-            )
+        if any(record.state not in ['closed', 'canceled'] for record in self):
+            raise UserError(_('Només es poden reobrir reclamacions tancades o cancel·lades.'))
+
+        # Les reclamacions amb missatges tornen a "En tractament", la resta a "Nova"
+        groups = self.env['custom.claim.message']._read_group(
+            [('claim_id', 'in', self.ids)],
+            ['claim_id'],
+        )
+        with_messages = self.browse(claim.id for claim, in groups)
+        for new_state, claims in (('in_progress', with_messages), ('new', self - with_messages)):
+            if claims:
+                claims.with_context(claim_bulk_operation='action_reopen').write({
+                    'state': new_state,
+                    'close_date': False,
+                    'escalated': False,
+                })
+        self._log_note_batch("🔄 La reclamació ha estat reoberta.")
         return True
 
     # Mètode per cancel·lar la comanda de venda associada
+    @profiled('custom.claim.action_cancel_order')
     def action_cancel_order(self):
-        for record in self:
-            if not record.sale_order_id:
-                raise UserError(_('No hi ha cap comanda de venda associada a aquesta reclamació.'))
-
-            # Verificar si hi ha factures publicades
-            if record.sale_order_id.invoice_ids.filtered(lambda inv: inv.state == 'posted'):
-                raise UserError(_('No es pot cancel·lar la comanda perquè té factures publicades.'))
-
-            # Cancel·lar la comanda de venda si no està ja cancel·lada o finalitzada
-            if record.sale_order_id.state not in ['cancel', 'done']:
-                record.sale_order_id._action_cancel()  # Utilitzem el mètode intern per cancel·lar la comanda
-
-            # Cancel·lar les factures no publicades
-            invoices_to_cancel = record.sale_order_id.invoice_ids.filtered(lambda inv: inv.state != 'posted')
-            if invoices_to_cancel:
-                invoices_to_cancel.button_cancel()
-
-            # Cancel·lar els enviaments no fets
-            pickings_to_cancel = record.sale_order_id.picking_ids.filtered(lambda p: p.state != 'done')
-            if pickings_to_cancel:
-                pickings_to_cancel.action_cancel()
-
-            # Enviar correu al client utilitzant la plantilla per defecte d'Odoo
-            template = self.env.ref('sale.mail_template_sale_cancellation', raise_if_not_found=False)
-            if template:
-                template.send_mail(record.sale_order_id.id, force_send=True)
-
-            # Notificar al chatter de la comanda sobre la cancel·lació i l'enviament del correu
-            record.sale_order_id.message_post(
-                body=f"El client ha estat notificat per correu de la cancel·lació de la comanda {record.sale_order_id.name}.",
-                message_type='comment',
-                subtype_xmlid='mail.mt_note'
-            )
+        if any(not record.sale_order_id for record in self):
+            raise UserError(_('No hi ha cap comanda de venda associada a aquesta reclamació.'))
 
-            # Actualitzar l'estat de la reclamació si és necessari
-            if record.state in ['new', 'in_progress']:
-                record.write({
-                    'state': 'canceled',
-                    'close_date': fields.Datetime.now(),
-                })
+        orders = self.sale_order_id
+        # Verificar si hi ha factures publicades
+        if orders.invoice_ids.filtered(lambda inv: inv.state == 'posted'):
+            raise UserError(_('No es pot cancel·lar la comanda perquè té factures publicades.'))
+
+        # Cancel·lar les comandes de venda no cancel·lades ni finalitzades
+        orders_to_cancel = orders.filtered(lambda order: order.state not in ['cancel', 'done'])
+        if orders_to_cancel:
+            orders_to_cancel._action_cancel()  # Utilitzem el mètode intern per cancel·lar la comanda
+
+        # Cancel·lar les factures no publicades
+        invoices_to_cancel = orders.invoice_ids.filtered(lambda inv: inv.state != 'posted')
+        if invoices_to_cancel:
+            invoices_to_cancel.button_cancel()
+
+        # Cancel·lar els enviaments no fets
+        pickings_to_cancel = orders.picking_ids.filtered(lambda p: p.state != 'done')
+        if pickings_to_cancel:
+            pickings_to_cancel.action_cancel()
+
+        # Actualitzar l'estat de les reclamacions obertes
+        open_claims = self.filtered(lambda record: record.state in ['new', 'in_progress'])
+        if open_claims:
+            open_claims.with_context(claim_bulk_operation='action_cancel_order').write({
+                'state': 'canceled',
+                'close_date': fields.Datetime.now(),
+            })
+
+        # El correu al client s'encua i l'envia el cron per lots: l'acció no
+        # espera el servidor SMTP. La nota al chatter de la comanda es publica
+        # quan el correu s'ha enviat realment.
+        self.env['custom.claim.notification']._enqueue_cancellation(self)
+        return True
+
+    # Crear un treball de cancel·lació massiva per a les reclamacions
+    # seleccionades; el processen diversos treballadors en paral·lel
+    def action_mass_cancel_order(self):
+        job = self.env['custom.claim.cancel.job'].create({
+            'line_ids': [Command.create({'claim_id': claim.id}) for claim in self],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': job._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+        }
+
+    # Cron d'escalat de l'SLA. Recorre les reclamacions vençudes per lots
+    # ordenats per (sla_deadline, id) sobre un índex parcial, sense carregar
+    # mai tot el conjunt obert. Després de cada lot desa el punt de control
+    # (clau `sla_escalation` de custom.claim.checkpoint) i, amb auto_commit,
+    # confirma la transacció: una execució interrompuda continua on s'havia aturat.
+    @api.model
+    def _cron_escalate_sla(self, batch_size=1000, auto_commit=False):
+        ICP = self.env['ir.config_parameter'].sudo()
+        Checkpoint = self.env['custom.claim.checkpoint']
+        time_limit = time.monotonic() + int(ICP.get_param('custom_claims.sla_max_seconds', 300))
+        now = fields.Datetime.now()
+        checkpoint = self._parse_sla_checkpoint(Checkpoint._get_value('sla_escalation'))
+        while True:
+            rows = self._get_sla_batch(now, checkpoint, batch_size)
+            self.browse(row[0] for row in rows)._escalate_sla()
+            finished = len(rows) < batch_size
+            checkpoint = None if finished else rows[-1][1:]
+            Checkpoint._set_value('sla_escalation', self._format_sla_checkpoint(checkpoint))
+            if auto_commit:
+                self.env.cr.commit()
+            if finished:
+                return
+            if time.monotonic() >= time_limit:
+                # Temps esgotat: una nova execució continua des del punt de control
+                self.env.ref('custom_claims.ir_cron_claim_sla_escalation')._trigger()
+                return
+
+    @api.model
+    def _parse_sla_checkpoint(self, value):
+        if not value:
+            return None
+        deadline, claim_id = value.split('|')
+        return fields.Datetime.to_datetime(deadline), int(claim_id)
+
+    @api.model
+    def _format_sla_checkpoint(self, checkpoint):
+        if not checkpoint:
+            return False
+        return f'{fields.Datetime.to_string(checkpoint[0])}|{checkpoint[1]}'
+
+    # Següent lot de reclamacions vençudes posteriors al punt de control
+    @api.model
+    def _get_sla_batch(self, now, checkpoint, batch_size):
+        self.flush_model(['state', 'sla_deadline', 'escalated'])
+        after = SQL("AND (sla_deadline, id) > (%s, %s)", *checkpoint) if checkpoint else SQL()
+        self.env.cr.execute(SQL(
+            """
+            SELECT id, sla_deadline
+              FROM custom_claim
+             WHERE state IN ('new', 'in_progress')
+               AND escalated IS NOT TRUE
+               AND sla_deadline <= %(now)s
+                   %(after)s
+          ORDER BY sla_deadline, id
+             LIMIT %(limit)s
+            """,
+            now=now,
+            after=after,
+            limit=batch_size,
+        ))
+        return self.env.cr.fetchall()
+
+    # Escalar un lot: reassignar, marcar i programar una activitat per
+    # reclamació, amb una sola escriptura i una sola creació d'activitats
+    def _escalate_sla(self):
+        if not self:
+            return
+        claims = self.sudo().with_context(claim_bulk_mode=True, claim_bulk_operation='sla_escalation')
+        escalation_user_id = int(self.env['ir.config_parameter'].sudo().get_param(
+            'custom_claims.sla_escalation_user_id', 0))
+        vals = {'escalated': True}
+        if escalation_user_id:
+            vals['user_id'] = escalation_user_id
+        claims.write(vals)
+        activity_type = self.env.ref('mail.mail_activity_data_todo')
+        model_id = self.env['ir.model']._get_id(self._name)
+        today = fields.Date.context_today(self)
+        self.env['mail.activity'].sudo().with_context(mail_activity_quick_update=True).create([{
+            'activity_type_id': activity_type.id,
+            'res_model_id': model_id,
+            'res_id': claim.id,
+            'user_id': claim.user_id.id or self.env.uid,
+            'summary': _('SLA superat'),
+            'date_deadline': today,
+        } for claim in claims])
+
+    # Llindar de similitud de trigrames per als duplicats: un valor entre 0 i
+    # 1; si el paràmetre no és vàlid es fa servir el valor per defecte
+    _default_duplicate_threshold = 0.5
+
+    @api.model
+    def _get_duplicate_threshold(self):
+        value = self.env['ir.config_parameter'].sudo().get_param('custom_claims.duplicate_threshold')
+        if not value:
+            return self._default_duplicate_threshold
+        try:
+            threshold = float(value)
+        except ValueError:
+            threshold = None
+        if threshold is None or not 0.0 <= threshold <= 1.0:
+            _logger.warning(
+                "Paràmetre custom_claims.duplicate_threshold no vàlid (%r): es fa servir %s",
+                value, self._default_duplicate_threshold)
+            return self._default_duplicate_threshold
+        return threshold
+
+    # Cercar, per a cada reclamació, les més semblants del mateix client amb
+    # una sola consulta: el LATERAL fa servir l'índex per client i els índexs
+    # GIN de trigrames de l'assumpte i la descripció (operador %), sense cap
+    # comparació a Python. El llindar és `custom_claims.duplicate_threshold`.
+    def _detect_duplicates(self):
+        if not self:
+            return
+        self.flush_model(['partner_id', 'subject', 'description', 'duplicate_checked'])
+        cr = self.env.cr
+        if self.env.registry.has_trigram:
+            ICP = self.env['ir.config_parameter'].sudo()
+            threshold = str(self._get_duplicate_threshold())
+            limit = int(ICP.get_param('custom_claims.duplicate_limit', 5))
+            cr.execute("SELECT current_setting('pg_trgm.similarity_threshold', true)")
+            previous = cr.fetchone()[0] or '0.3'
+            cr.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [threshold])
+            try:
+                cr.execute("DELETE FROM custom_claim_duplicate_rel WHERE claim_id = ANY(%s)", [self.ids])
+                cr.execute(
+                    """
+                    INSERT INTO custom_claim_duplicate_rel (claim_id, candidate_id)
+                    SELECT claim.id, candidate.id
+                      FROM custom_claim claim
+                CROSS JOIN LATERAL (
+                        SELECT other.id
+                          FROM custom_claim other
+                         WHERE other.partner_id = claim.partner_id
+                           AND other.id != claim.id
+                           AND (other.subject %% claim.subject OR other.description %% claim.description)
+                      ORDER BY GREATEST(
+                                   similarity(other.subject, claim.subject),
+                                   similarity(other.description, claim.description)
+                               ) DESC, other.id DESC
+                         LIMIT %(limit)s
+                       ) candidate
+                     WHERE claim.id = ANY(%(ids)s)
+                    """,
+                    {'ids': self.ids, 'limit': limit},
+                )
+            finally:
+                cr.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [previous])
+        cr.execute("UPDATE custom_claim SET duplicate_checked = true WHERE id = ANY(%s)", [self.ids])
+        self.invalidate_recordset(['duplicate_candidate_ids', 'duplicate_checked'])
 
-        return True
\ No newline at end of file
+    # Cron de revisió retroactiva: processa per lots les reclamacions que no
+    # s'han revisat mai (creades en bloc o anteriors a aquesta funcionalitat)
+    @api.model
+    def _cron_detect_duplicates(self, batch_size=500, auto_commit=False):
+        claims = self.sudo().search([('duplicate_checked', '=', False)], order='id', limit=batch_size)
+        claims._detect_duplicates()
+        if auto_commit:
+            self.env.cr.commit()
+        if len(claims) == batch_size:
+            # Encara en queden: continuar en una altra execució amb un lot nou
+            self.env.ref('custom_claims.ir_cron_claim_duplicates')._trigger()
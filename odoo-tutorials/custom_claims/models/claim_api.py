@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class ClaimApi(models.AbstractModel):
+    _name = 'custom.claim.api'
+    _description = "API d'entrada i consulta de reclamacions"
+
+    # Elements (reclamacions, missatges o referències) admesos per petició
+    _max_batch = 1000
+
+    # Crear en una sola petició un lot de reclamacions i un lot de missatges.
+    # Cada element respon a la mateixa posició de la llista d'entrada amb la
+    # referència creada o amb l'error; un element erroni no fa fallar la resta.
+    @api.model
+    def _intake(self, claim_rows, message_rows):
+        if len(claim_rows) + len(message_rows) > self._max_batch:
+            raise UserError(_('Com a màxim es poden enviar %s elements per petició.', self._max_batch))
+        return {
+            'claims': self._intake_claims(claim_rows),
+            'messages': self._intake_messages(message_rows),
+        }
+
+    @api.model
+    def _intake_claims(self, rows):
+        if not rows:
+            return []
+        order_names = {str(row.get('sale_order') or '').strip() for row in rows if isinstance(row, dict)}
+        Import = self.env['custom.claim.import']
+        orders = Import._get_order_map(order_names)
+        reasons = self.env['custom.closure.reason']._get_code_map()
+        results = [None] * len(rows)
+        batch = []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                results[index] = {'error': _('La reclamació no és un objecte JSON')}
+                continue
+            vals, error = Import._prepare_claim_vals(row, orders, reasons)
+            if error:
+                results[index] = {'error': error}
+            else:
+                batch.append((index, vals))
+        # Sense mode en bloc: les reclamacions rebudes per API tenen el mateix
+        # historial i la mateixa detecció de duplicats que les creades a mà
+        for index, claim in self._create_batch(self.env['custom.claim'], batch, results):
+            results[index] = {'reference': claim.name, 'id': claim.id, 'state': claim.state}
+        return results
+
+    @api.model
+    def _intake_messages(self, rows):
+        if not rows:
+            return []
+        references = {str(row.get('claim') or '').strip() for row in rows if isinstance(row, dict)}
+        claims = {
+            claim.name: claim.id
+            for claim in self.env['custom.claim'].search_fetch([('name', 'in', list(references))], ['name'])
+        }
+        results = [None] * len(rows)
+        batch = []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                results[index] = {'error': _('El missatge no és un objecte JSON')}
+                continue
+            reference = str(row.get('claim') or '').strip()
+            if reference not in claims:
+                results[index] = {'error': _('Reclamació desconeguda: %s', reference)}
+            elif not row.get('content'):
+                results[index] = {'error': _('El missatge no té contingut')}
+            else:
+                batch.append((index, {'claim_id': claims[reference], 'content': row['content']}))
+        for index, message in self._create_batch(self.env['custom.claim.message'], batch, results):
+            results[index] = {'id': message.id}
+        return results
+
+    # Crear tot el lot amb una sola crida dins d'un punt de restauració i, si
+    # falla, element a element per aïllar els erronis. Al client només se li
+    # retornen els missatges d'error funcionals; la resta es registren al log
+    @api.model
+    def _create_batch(self, model, batch, results):
+        if not batch:
+            return []
+        try:
+            with self.env.cr.savepoint():
+                records = model.create([vals for _index, vals in batch])
+            return list(zip([index for index, _vals in batch], records))
+        except Exception:
+            created = []
+            for index, vals in batch:
+                try:
+                    with self.env.cr.savepoint():
+                        created.append((index, model.create([vals])))
+                except UserError as e:
+                    results[index] = {'error': str(e)}
+                except Exception:
+                    _logger.exception("Error en crear un element de %s per l'API", model._name)
+                    results[index] = {'error': _("No s'ha pogut crear l'element")}
+            return created
+
+    # Validador condicional d'un conjunt de referències: nombre de
+    # reclamacions per estat i data de modificació més recent, amb una sola
+    # consulta agregada que no llegeix les files
+    @api.model
+    def _status_validator(self, references):
+        if len(references) > self._max_batch:
+            raise UserError(_('Com a màxim es poden consultar %s referències per petició.', self._max_batch))
+        groups = self.env['custom.claim']._read_group(
+            [('name', 'in', references)], ['state'], ['__count', 'write_date:max'], order='state')
+        last_modified = max((write_date for _state, _count, write_date in groups), default=False)
+        counts = ','.join(f'{state}:{count}' for state, count, _write_date in groups)
+        digest = hashlib.sha1(
+            f"{counts}|{last_modified}|{','.join(sorted(references))}".encode()).hexdigest()
+        return f'W/"{digest}"', last_modified
+
+    # Estat de moltes reclamacions amb una sola lectura
+    @api.model
+    def _status(self, references):
+        claims = self.env['custom.claim'].search_fetch(
+            [('name', 'in', references)], ['name', 'state', 'write_date', 'close_date'], order='id')
+        found = set(claims.mapped('name'))
+        return {
+            'claims': [{
+                'reference': claim.name,
+                'state': claim.state,
+                'write_date': fields.Datetime.to_string(claim.write_date),
+                'close_date': fields.Datetime.to_string(claim.close_date),
+            } for claim in claims],
+            'unknown': [reference for reference in references if reference not in found],
+        }
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+
+
+class ClaimArchive(models.Model):
+    _name = 'custom.claim.archive'
+    _description = 'Reclamació arxivada'
+    # L'historial de chatter de la reclamació (missatges, seguiment, seguidors
+    # i activitats) passa a l'arxiu sense copiar-lo
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _order = 'close_date desc, id desc'
+
+    name = fields.Char(string='Referència', readonly=True, index=True)
+    subject = fields.Char(string='Assumpte', readonly=True)
+    description = fields.Text(string='Descripció inicial', readonly=True)
+    state = fields.Selection(
+        selection=[
+            ('closed', 'Tancada'),
+            ('canceled', 'Cancel·lada')],
+        string='Estat',
+        readonly=True
+    )
+    sale_order_id = fields.Many2one('sale.order', string='Comanda associada', readonly=True, index=True, ondelete='restrict')
+    partner_id = fields.Many2one('res.partner', string='Client', readonly=True, index=True)
+    commercial_partner_id = fields.Many2one(
+        'res.partner', string='Empresa client', related='partner_id.commercial_partner_id', store=True, index=True)
+    user_id = fields.Many2one('res.users', string='Responsable', readonly=True, index=True)
+    resolution = fields.Text(string='Resolució final', readonly=True)
+    closure_reason_id = fields.Many2one('custom.closure.reason', string='Motiu tancament', readonly=True)
+    claim_create_date = fields.Datetime(string='Data creació', readonly=True)
+    close_date = fields.Datetime(string='Data tancament', readonly=True)
+    # Fil de missatges desat en una sola columna JSON
+    messages = fields.Json(string='Missatges', readonly=True)
+    message_count = fields.Integer(string='Nombre de missatges', readonly=True)
+    messages_text = fields.Text(string='Fil de missatges', compute='_compute_messages_text')
+
+    # Camps de custom.claim que es conserven a l'arxiu
+    _claim_fields = [
+        'name', 'subject', 'description', 'state', 'sale_order_id', 'partner_id', 'user_id',
+        'resolution', 'closure_reason_id', 'close_date',
+    ]
+    _message_fields = ['content', 'author_id', 'message_type', 'is_system_message', 'create_date']
+
+    @api.depends('messages')
+    def _compute_messages_text(self):
+        for archive in self:
+            archive.messages_text = '\n\n'.join(
+                f"{message['create_date']}: {message['content']}" for message in archive.messages or [])
+
+    # Cron: moure a l'arxiu, per lots acotats, les reclamacions tancades o
+    # cancel·lades fa més de `custom_claims.archive_after_days` dies
+    @api.model
+    def _cron_archive_claims(self, batch_size=1000):
+        days = int(self.env['ir.config_parameter'].sudo().get_param('custom_claims.archive_after_days', 365))
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        claims = self.env['custom.claim'].sudo().search([
+            ('state', 'in', ('closed', 'canceled')),
+            ('close_date', '<', limit_date),
+        ], order='close_date, id', limit=batch_size)
+        self._archive_claims(claims)
+        if len(claims) == batch_size:
+            # Encara en queden: continuar en una altra execució amb un lot nou
+            self.env.ref('custom_claims.ir_cron_claim_archive')._trigger()
+
+    @api.model
+    def _archive_claims(self, claims):
+        if not claims:
+            return self
+        messages_by_claim = defaultdict(list)
+        for message in self.env['custom.claim.message'].sudo().search_read(
+            [('claim_id', 'in', claims.ids)],
+            ['claim_id'] + self._message_fields,
+            order='create_date, id',
+            load=None,
+        ):
+            claim_id = message.pop('claim_id')
+            message.pop('id')
+            message['create_date'] = fields.Datetime.to_string(message['create_date'])
+            messages_by_claim[claim_id].append(message)
+
+        vals_list = []
+        for claim in claims.read(self._claim_fields + ['create_date'], load=None):
+            claim_messages = messages_by_claim[claim['id']]
+            vals = {fname: claim[fname] for fname in self._claim_fields}
+            vals.update(
+                claim_create_date=claim['create_date'],
+                messages=claim_messages,
+                message_count=len(claim_messages),
+            )
+            vals_list.append(vals)
+        archives = self.sudo().with_context(mail_create_nolog=True, mail_create_nosubscribe=True).create(vals_list)
+        self._move_mail_history('custom.claim', self._name, claims.ids, archives.ids)
+        self.env['custom.claim.audit']._log_batch('archive', claims)
+        # Els missatges s'eliminen en cascada a la base de dades
+        claims.unlink()
+        return archives
+
+    # Restaurar les reclamacions arxivades a la taula viva, amb les dates originals
+    def _restore(self):
+        Claim = self.env['custom.claim'].with_context(claim_bulk_mode=True, claim_bulk_operation='restore')
+        claims = Claim.create([
+            {fname: archive[fname].id if fname.endswith('_id') else archive[fname] for fname in self._claim_fields
+             if fname != 'partner_id'}
+            for archive in self
+        ])
+        messages = self.env['custom.claim.message'].create([
+            dict({fname: message[fname] for fname in self._message_fields if fname != 'create_date'}, claim_id=claim.id)
+            for archive, claim in zip(self, claims)
+            for message in archive.messages or []
+        ])
+        self._move_mail_history(self._name, 'custom.claim', self.ids, claims.ids)
+        self._restore_create_dates('custom_claim', claims.ids, self.mapped('claim_create_date'))
+        self._restore_create_dates('custom_claim_message', messages.ids, [
+            fields.Datetime.to_datetime(message['create_date'])
+            for archive in self
+            for message in archive.messages or []
+        ])
+        self.env.invalidate_all()
+        self.sudo().unlink()
+        return claims
+
+    # Traspassar l'historial de chatter d'uns registres a uns altres, parell a
+    # parell, amb una sentència per taula
+    @api.model
+    def _move_mail_history(self, from_model, to_model, from_ids, to_ids):
+        if not from_ids:
+            return
+        self.env.flush_all()
+        cr = self.env.cr
+        pairs = SQL("unnest(%s::int[], %s::int[]) AS v(from_id, to_id)", from_ids, to_ids)
+        cr.execute(SQL(
+            """
+            UPDATE mail_message AS t
+               SET model = %(to_model)s, res_id = v.to_id
+              FROM %(pairs)s
+             WHERE t.model = %(from_model)s AND t.res_id = v.from_id
+            """,
+            from_model=from_model, to_model=to_model, pairs=pairs,
+        ))
+        # Un seguidor que ja segueix el registre de destinació no es duplica
+        cr.execute(SQL(
+            """
+            UPDATE mail_followers AS t
+               SET res_model = %(to_model)s, res_id = v.to_id
+              FROM %(pairs)s
+             WHERE t.res_model = %(from_model)s AND t.res_id = v.from_id
+               AND NOT EXISTS (
+                       SELECT 1
+                         FROM mail_followers f
+                        WHERE f.res_model = %(to_model)s AND f.res_id = v.to_id AND f.partner_id = t.partner_id
+                   )
+            """,
+            from_model=from_model, to_model=to_model, pairs=pairs,
+        ))
+        cr.execute(SQL(
+            """
+            UPDATE mail_activity AS t
+               SET res_model = %(to_model)s, res_model_id = %(to_model_id)s, res_id = v.to_id
+              FROM %(pairs)s
+             WHERE t.res_model = %(from_model)s AND t.res_id = v.from_id
+            """,
+            from_model=from_model, to_model=to_model, pairs=pairs,
+            to_model_id=self.env['ir.model']._get_id(to_model),
+        ))
+        self.env.invalidate_all()
+
+    @api.model
+    def _restore_create_dates(self, table, ids, dates):
+        if ids:
+            self.env.cr.execute(SQL(
+                """
+                UPDATE %s AS t
+                   SET create_date = v.create_date
+                  FROM unnest(%s::int[], %s::timestamp[]) AS v(id, create_date)
+                 WHERE t.id = v.id
+                """,
+                SQL.identifier(table), ids, dates,
+            ))
+
+    # Reobrir una reclamació arxivada: es restaura i es reobre com qualsevol altra
+    def action_reopen(self):
+        claims = self._restore()
+        claims.action_reopen()
+        action = {
+            'type': 'ir.actions.act_window',
+            'name': _('Reclamacions'),
+            'res_model': 'custom.claim',
+        }
+        if len(claims) == 1:
+            action.update(view_mode='form', res_id=claims.id)
+        else:
+            action.update(view_mode='list,form', domain=[('id', 'in', claims.ids)])
+        return action
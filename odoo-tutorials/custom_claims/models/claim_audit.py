@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class ClaimAudit(models.Model):
+    _name = 'custom.claim.audit'
+    _description = 'Registre d\'operacions en bloc sobre reclamacions'
+    _order = 'create_date desc, id desc'
+
+    operation = fields.Char(string='Operació', required=True, readonly=True)
+    claim_count = fields.Integer(string='Reclamacions', readonly=True)
+    # Identificadors afectats en forma de rangs [inici, final] consecutius
+    claim_id_ranges = fields.Json(string='Reclamacions afectades', readonly=True)
+    # Per a cada camp: recompte de valors antics i valor nou
+    changes = fields.Json(string='Canvis', readonly=True)
+    changes_summary = fields.Text(string='Resum', compute='_compute_changes_summary')
+
+    @api.depends('changes')
+    def _compute_changes_summary(self):
+        for audit in self:
+            lines = []
+            for fname, change in (audit.changes or {}).items():
+                old = ', '.join(f'{value} ({count})' for value, count in change['old'].items())
+                lines.append(f"{fname}: {old} → {change['new']}")
+            audit.changes_summary = '\n'.join(lines)
+
+    # Compactar una llista d'identificadors en rangs consecutius
+    @api.model
+    def _compact_ids(self, ids):
+        ranges = []
+        for record_id in sorted(ids):
+            if ranges and ranges[-1][1] == record_id - 1:
+                ranges[-1][1] = record_id
+            else:
+                ranges.append([record_id, record_id])
+        return ranges
+
+    # Resum dels valors actuals dels camps rastrejats: {valor: nombre de reclamacions}
+    @api.model
+    def _summarize_values(self, claims, field_names):
+        summary = {}
+        for fname in field_names:
+            groups = claims.sudo()._read_group([('id', 'in', claims.ids)], [fname], ['__count'])
+            summary[fname] = {
+                str(value.id if isinstance(value, models.BaseModel) else value): count
+                for value, count in groups
+            }
+        return summary
+
+    @api.model
+    def _log_batch(self, operation, claims, changes=None):
+        return self.sudo().create({
+            'operation': operation,
+            'claim_count': len(claims),
+            'claim_id_ranges': self._compact_ids(claims.ids),
+            'changes': changes or {},
+        })
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from psycopg2 import errorcodes
+
+from odoo import models, fields, api, tools, _
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+# Errors de concurrència que es resolen tornant a executar la transacció
+CONCURRENCY_ERRORS = (
+    errorcodes.SERIALIZATION_FAILURE,
+    errorcodes.DEADLOCK_DETECTED,
+    errorcodes.LOCK_NOT_AVAILABLE,
+)
+
+
+def _is_concurrency_error(error):
+    return getattr(error, 'pgcode', None) in CONCURRENCY_ERRORS
+
+
+class ClaimCancelJob(models.Model):
+    _name = 'custom.claim.cancel.job'
+    _description = 'Cancel·lació massiva de comandes'
+    _order = 'id desc'
+
+    # Temps màxim (segons) d'una execució del cron abans de cedir el torn
+    _max_run_seconds = 600
+    # Espera base (minuts) abans de tornar a provar una línia fallida; es dobla
+    # a cada intent fallit
+    _retry_base_minutes = 1
+    # Reintents seguits d'un bloc que topa amb un error de concurrència
+    _max_concurrency_retries = 5
+
+    name = fields.Char(string='Nom', compute='_compute_name')
+    state = fields.Selection(
+        selection=[
+            ('draft', 'Esborrany'),
+            ('running', 'En curs'),
+            ('done', 'Acabat')],
+        string='Estat',
+        default='draft',
+        required=True,
+        readonly=True
+    )
+    chunk_size = fields.Integer(string='Reclamacions per bloc', default=100, required=True)
+    worker_count = fields.Integer(string='Treballadors', default=4, required=True)
+    max_attempts = fields.Integer(string='Intents màxims', default=3, required=True)
+    line_ids = fields.One2many('custom.claim.cancel.job.line', 'job_id', string='Línies')
+    start_date = fields.Datetime(string='Inici', readonly=True)
+    end_date = fields.Datetime(string='Final', readonly=True)
+    total_count = fields.Integer(string='Total', compute='_compute_progress')
+    pending_count = fields.Integer(string='Pendents', compute='_compute_progress')
+    done_count = fields.Integer(string='Cancel·lades', compute='_compute_progress')
+    failed_count = fields.Integer(string='Fallides', compute='_compute_progress')
+    progress = fields.Float(string='Progrés', compute='_compute_progress')
+    claims_per_second = fields.Float(string='Reclamacions per segon', compute='_compute_progress')
+
+    def _compute_name(self):
+        for job in self:
+            job.name = _('Cancel·lació massiva %s', job.id)
+
+    def _compute_progress(self):
+        groups = self.env['custom.claim.cancel.job.line']._read_group(
+            [('job_id', 'in', self.ids)], ['job_id', 'state'], ['__count'])
+        counts = {(job.id, state): count for job, state, count in groups}
+        now = fields.Datetime.now()
+        for job in self:
+            job.pending_count = counts.get((job.id, 'pending'), 0)
+            job.done_count = counts.get((job.id, 'done'), 0)
+            job.failed_count = counts.get((job.id, 'failed'), 0)
+            job.total_count = job.pending_count + job.done_count + job.failed_count
+            job.progress = 100.0 * (job.done_count + job.failed_count) / job.total_count if job.total_count else 0.0
+            elapsed = ((job.end_date or now) - job.start_date).total_seconds() if job.start_date else 0
+            job.claims_per_second = job.done_count / elapsed if elapsed else 0.0
+
+    def action_start(self):
+        self.filtered(lambda job: job.state == 'draft').write({
+            'state': 'running',
+            'start_date': fields.Datetime.now(),
+        })
+        self.env.ref('custom_claims.ir_cron_claim_cancel_jobs')._trigger()
+        return True
+
+    def action_retry_failed(self):
+        self.env['custom.claim.cancel.job.line'].search([
+            ('job_id', 'in', self.ids), ('state', '=', 'failed'),
+        ]).write({'state': 'pending', 'attempts': 0, 'error': False, 'next_attempt': fields.Datetime.now()})
+        self.write({'state': 'running', 'end_date': False})
+        self.env.ref('custom_claims.ir_cron_claim_cancel_jobs')._trigger()
+        return True
+
+    def action_view_lines(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Línies'),
+            'res_model': 'custom.claim.cancel.job.line',
+            'view_mode': 'list',
+            'domain': [('job_id', '=', self.id)],
+        }
+
+    # Cron: executar els treballs en curs. Cada treballador té el seu propi
+    # cursor i agafa blocs de línies amb SELECT ... FOR UPDATE SKIP LOCKED, de
+    # manera que altres execucions concurrents (altres processos) hi col·laboren.
+    # Amb threaded=False els blocs es processen en seqüència al cursor actual
+    @api.model
+    def _cron_process_jobs(self, threaded=True):
+        deadline = time.monotonic() + self._max_run_seconds
+        jobs = self.search_fetch([('state', '=', 'running')], ['chunk_size', 'worker_count'])
+        if threaded:
+            # Tancar la transacció del cron abans d'engegar els treballadors,
+            # perquè no quedi oberta i inactiva mentre treballen
+            self.env.cr.commit()
+        for job in jobs:
+            if threaded:
+                job._run_workers(deadline)
+            else:
+                while time.monotonic() < deadline and job._process_next_chunk():
+                    pass
+                job._check_finished()
+            if time.monotonic() >= deadline:
+                self.env.ref('custom_claims.ir_cron_claim_cancel_jobs')._trigger()
+                break
+
+    def _run_workers(self, deadline):
+        self.ensure_one()
+        threads = [
+            threading.Thread(
+                target=self._worker_loop,
+                args=(self.env.cr.dbname, self.env.uid, dict(self.env.context), self.id, deadline),
+                name=f'claim_cancel_job_{self.id}_{index}',
+            )
+            for index in range(max(self.worker_count, 1))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # La finalització es comprova en un cursor nou, que veu els blocs
+        # confirmats pels treballadors
+        with Registry(self.env.cr.dbname).cursor() as cr:
+            self.with_env(self.env(cr=cr))._check_finished()
+        self.env.invalidate_all()
+
+    # Els errors de concurrència desfan el bloc sencer (les línies continuen
+    # pendents) i es reintenten en una transacció nova amb una espera
+    # creixent; qualsevol altre error atura només aquest treballador
+    @api.model
+    def _worker_loop(self, dbname, uid, context, job_id, deadline):
+        threading.current_thread().dbname = dbname
+        registry = Registry(dbname)
+        conflicts = 0
+        while time.monotonic() < deadline:
+            try:
+                # Un cursor i un commit per bloc: els bloquejos duren només un bloc
+                with registry.cursor() as cr:
+                    job = api.Environment(cr, uid, context)[self._name].browse(job_id)
+                    if not job._process_next_chunk():
+                        return
+                conflicts = 0
+            except Exception as e:
+                if not _is_concurrency_error(e) or conflicts >= self._max_concurrency_retries:
+                    _logger.exception("Error en un treballador de la cancel·lació massiva %s", job_id)
+                    return
+                conflicts += 1
+                _logger.info("Conflicte de concurrència a la cancel·lació massiva %s, reintent %s", job_id, conflicts)
+                time.sleep(random.uniform(0.0, 0.1 * 2 ** conflicts))
+
+    # Processar el següent bloc de línies pendents que ja toca provar; retorna
+    # False si no en queden
+    def _process_next_chunk(self):
+        self.ensure_one()
+        self.env['custom.claim.cancel.job.line'].flush_model(['state', 'next_attempt'])
+        self.env.cr.execute(
+            """
+            SELECT id
+              FROM custom_claim_cancel_job_line
+             WHERE job_id = %s AND state = 'pending' AND next_attempt <= %s
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            (self.id, fields.Datetime.now(), self.chunk_size),
+        )
+        lines = self.env['custom.claim.cancel.job.line'].browse(row[0] for row in self.env.cr.fetchall())
+        if not lines:
+            return False
+        try:
+            with self.env.cr.savepoint():
+                lines._cancel_claims()
+            lines.write({'state': 'done'})
+        except Exception as e:
+            if _is_concurrency_error(e):
+                raise
+            # Es reprèn línia a línia per aïllar les reclamacions que fallen
+            for line in lines:
+                try:
+                    with self.env.cr.savepoint():
+                        line._cancel_claims()
+                    line.state = 'done'
+                except Exception as e:
+                    if _is_concurrency_error(e):
+                        raise
+                    line._schedule_retry(str(e))
+        return True
+
+    # Tancar els treballs sense línies pendents; si només en queden d'espera
+    # de reintent, programar el cron per al primer intent
+    def _check_finished(self):
+        pending = self.env['custom.claim.cancel.job.line']._read_group(
+            [('job_id', 'in', self.ids), ('state', '=', 'pending')], ['job_id'], ['next_attempt:min'])
+        finished = self - self.browse(job.id for job, _next_attempt in pending)
+        finished.write({'state': 'done', 'end_date': fields.Datetime.now()})
+        next_attempt = min((next_attempt for _job, next_attempt in pending), default=None)
+        if next_attempt and next_attempt > fields.Datetime.now():
+            self.env.ref('custom_claims.ir_cron_claim_cancel_jobs')._trigger(at=next_attempt)
+
+
+class ClaimCancelJobLine(models.Model):
+    _name = 'custom.claim.cancel.job.line'
+    _description = 'Reclamació d\'una cancel·lació massiva'
+    _order = 'id'
+
+    job_id = fields.Many2one('custom.claim.cancel.job', string='Treball', required=True, ondelete='cascade')
+    claim_id = fields.Many2one('custom.claim', string='Reclamació', required=True, ondelete='cascade')
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendent'),
+            ('done', 'Cancel·lada'),
+            ('failed', 'Fallida')],
+        string='Estat',
+        default='pending',
+        required=True
+    )
+    attempts = fields.Integer(string='Intents')
+    next_attempt = fields.Datetime(string='Proper intent', default=fields.Datetime.now, required=True)
+    error = fields.Text(string='Error')
+
+    # Índex per agafar els blocs pendents de cada treball
+    def init(self):
+        super().init()
+        tools.create_index(
+            self.env.cr,
+            'custom_claim_cancel_job_line_job_id_state_idx',
+            self._table,
+            ['job_id', 'state', 'id'],
+        )
+
+    # Tornar la línia a pendent amb una espera que es dobla a cada intent, o
+    # donar-la per fallida en arribar als intents màxims del treball
+    def _schedule_retry(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        values = {'attempts': attempts, 'error': error}
+        if attempts >= self.job_id.max_attempts:
+            values['state'] = 'failed'
+        else:
+            delay = timedelta(minutes=self.job_id._retry_base_minutes * 2 ** (attempts - 1))
+            values['next_attempt'] = fields.Datetime.now() + delay
+        self.write(values)
+
+    def _cancel_claims(self):
+        claims = self.claim_id.with_context(claim_bulk_mode=True)
+        claims.filtered(lambda claim: claim.state != 'canceled').action_cancel_order()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class ClaimCheckpoint(models.Model):
+    _name = 'custom.claim.checkpoint'
+    _description = 'Punt de control dels processos de reclamacions'
+    _log_access = False
+
+    # Estat intern dels crons (punts de control, marques de refresc) que canvia
+    # a cada lot. No es desa a ir.config_parameter perquè cada escriptura
+    # buida la memòria cau ormcache de tots els treballadors
+    key = fields.Char(string='Clau', required=True, readonly=True)
+    value = fields.Char(string='Valor', readonly=True)
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', "Només hi ha un valor per clau."),
+    ]
+
+    @api.model
+    def _get_value(self, key):
+        self.env.cr.execute(SQL("SELECT value FROM custom_claim_checkpoint WHERE key = %s", key))
+        row = self.env.cr.fetchone()
+        return row[0] if row else False
+
+    # Una sola sentència per desar el valor, sense passar per l'ORM
+    @api.model
+    def _set_value(self, key, value):
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO custom_claim_checkpoint (key, value)
+                 VALUES (%s, %s)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+            """,
+            key, value or None,
+        ))
@@ -1,10 +1,13 @@
 
-from odoo import models, fields, api, exceptions, _
+from odoo import models, fields, api, exceptions, tools, _
+from odoo.tools import SQL, split_every
+
+from .claim_perf import profiled
 
 class ClaimMessage(models.Model):
     _name = 'custom.claim.message'
     _description = 'Missatge de reclamació'
-    _order = 'create_date desc'
+    _order = 'create_date desc, id desc'
     _rec_name = 'create_date'
 
     claim_id = fields.Many2one(
@@ -46,18 +49,93 @@ class ClaimMessage(models.Model):
         readonly=True  # Només de lectura
     )
 
+    def init(self):
+        super().init()
+        # Índex per a la paginació per clau del fil de cada reclamació
+        tools.create_index(
+            self.env.cr,
+            'custom_claim_message_claim_id_create_date_id_idx',
+            self._table,
+            ['claim_id', 'create_date DESC', 'id DESC'],
+        )
+        # Índexs de cerca de text sobre el contingut (vegeu custom.claim)
+        for config in self.env['custom.claim']._get_available_text_search_configs():
+            tools.create_index(
+                self.env.cr,
+                f'custom_claim_message_text_search_{config}_idx',
+                self._table,
+                [f"to_tsvector('{config}'::regconfig, COALESCE(content, ''))"],
+                method='gin',
+            )
+        if self.env.registry.has_trigram:
+            tools.create_index(
+                self.env.cr,
+                'custom_claim_message_content_trgm_idx',
+                self._table,
+                ['content gin_trgm_ops'],
+                method='gin',
+            )
+
+    # Pàgina de missatges d'una reclamació, dels més recents als més antics.
+    # La paginació és per clau (create_date, id): `before` és el cursor retornat
+    # per la pàgina anterior i el cost no depèn de la llargada del fil.
+    @api.model
+    def _search_page(self, claim_id, before=None, limit=20):
+        query = self._search([('claim_id', '=', claim_id)], limit=limit + 1, order='create_date desc, id desc')
+        if before:
+            query.add_where(SQL(
+                "(%s, %s) < (%s, %s)",
+                SQL.identifier(self._table, 'create_date'), SQL.identifier(self._table, 'id'),
+                fields.Datetime.to_datetime(before[0]), before[1],
+            ))
+        messages = self.browse(query)
+        return messages[:limit], len(messages) > limit
+
+    @api.model
+    def read_page(self, claim_id, before=None, limit=20):
+        self.env['custom.claim'].browse(claim_id).check_access('read')
+        messages, has_more = self._search_page(claim_id, before=before, limit=limit)
+        last = messages[-1:]
+        return {
+            'messages': messages.read(['create_date', 'author_id', 'content', 'message_type', 'is_system_message']),
+            'next_cursor': [fields.Datetime.to_string(last.create_date), last.id] if has_more else False,
+        }
+
+    @api.model
+    def _text_search_vector(self, config, alias):
+        return SQL(
+            "to_tsvector(%s::regconfig, COALESCE(%s, ''))",
+            config, SQL.identifier(alias, 'content'),
+        )
+
     @api.model_create_multi
+    @profiled('custom.claim.message.create')
     def create(self, vals_list):
         messages = super().create(vals_list)
-        for message in messages:
-            # Solo si es un mensaje manual (no notificación del sistema)
-            if message.message_type == 'comment': 
-                claim = message.claim_id
-                if claim.state == 'new':
-                    claim.write({'state': 'in_progress'})
+        # Només els missatges manuals (no notificacions del sistema) passen la
+        # reclamació a "En tractament"; s'escriu un sol cop per a tot el lot
+        claims = messages.filtered(lambda m: m.message_type == 'comment').claim_id
+        claims_to_start = claims.filtered(lambda c: c.state == 'new')
+        if claims_to_start:
+            claims_to_start.write({'state': 'in_progress'})
         return messages
 
-        
+    # Importació massiva de missatges a partir d'un iterador de diccionaris de
+    # valors, creats per blocs de chunk_size sense materialitzar tot l'iterador
+    @api.model
+    def import_messages(self, vals_iter, chunk_size=1000, auto_commit=False):
+        count = 0
+        for vals_list in split_every(chunk_size, vals_iter, list):
+            self.create(vals_list)
+            count += len(vals_list)
+            if auto_commit:
+                self.env.cr.commit()
+            else:
+                self.env.flush_all()
+            # Alliberar la memòria cau entre blocs
+            self.env.invalidate_all()
+        return count
+
     def write(self, vals):
         raise exceptions.UserError(_('Els missatges són immutables'))
     
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+
+
+class ClaimNotification(models.Model):
+    _name = 'custom.claim.notification'
+    _description = 'Notificació de reclamació pendent'
+    _order = 'create_date desc, id desc'
+
+    # Nombre màxim d'intents abans de donar la notificació per fallida
+    _max_attempts = 5
+    # Espera base (minuts) entre intents; es dobla a cada intent fallit
+    _retry_base_minutes = 5
+
+    sale_order_id = fields.Many2one(
+        comodel_name='sale.order',
+        string='Comanda',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+    claim_id = fields.Many2one(
+        comodel_name='custom.claim',
+        string='Reclamació',
+        ondelete='set null',
+        readonly=True
+    )
+    template_id = fields.Many2one(
+        comodel_name='mail.template',
+        string='Plantilla',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendent'),
+            ('sent', 'Enviada'),
+            ('failed', 'Fallida')],
+        string='Estat',
+        default='pending',
+        required=True,
+        readonly=True
+    )
+    attempts = fields.Integer(string='Intents', readonly=True)
+    next_attempt = fields.Datetime(
+        string='Proper intent',
+        default=fields.Datetime.now,
+        index=True,
+        readonly=True
+    )
+    last_error = fields.Text(string='Últim error', readonly=True)
+    sent_date = fields.Datetime(string='Data enviament', readonly=True)
+    # Temps (segons) entre l'encuament i l'enviament efectiu
+    latency = fields.Float(string='Latència (s)', readonly=True, aggregator='avg')
+
+    # Encuar la notificació de cancel·lació per a cada comanda, sense esperar l'SMTP
+    @api.model
+    def _enqueue_cancellation(self, claims):
+        template = self.env.ref('sale.mail_template_sale_cancellation', raise_if_not_found=False)
+        if not template or not claims:
+            return self
+        notifications = self.sudo().create([{
+            'sale_order_id': claim.sale_order_id.id,
+            'claim_id': claim.id,
+            'template_id': template.id,
+        } for claim in claims])
+        self.env.ref('custom_claims.ir_cron_claim_notifications')._trigger()
+        return notifications
+
+    # Cron: enviar per lots les notificacions pendents amb reintents i espera exponencial
+    @api.model
+    def _cron_send_notifications(self, batch_size=200):
+        notifications = self.search(
+            [('state', '=', 'pending'), ('next_attempt', '<=', fields.Datetime.now())],
+            order='next_attempt, id',
+            limit=batch_size,
+        )
+        notifications._send_batch()
+        if len(notifications) == batch_size:
+            # Encara en queden: tornar a executar el cron en acabar aquest lot
+            self.env.ref('custom_claims.ir_cron_claim_notifications')._trigger()
+
+    def _send_batch(self):
+        if not self:
+            return
+        # Es generen tots els correus i s'envien junts, en una sola connexió SMTP per servidor
+        mail_by_notification = {
+            notification: self.env['mail.mail'].sudo().browse(
+                notification.template_id.send_mail(notification.sale_order_id.id, force_send=False))
+            for notification in self
+        }
+        mails = self.env['mail.mail'].sudo().union(*mail_by_notification.values())
+        mails.send(raise_exception=False)
+
+        now = fields.Datetime.now()
+        sent = self.browse()
+        for notification, mail in mail_by_notification.items():
+            # Els correus enviats amb auto_delete ja no existeixen
+            if not mail.exists() or mail.state == 'sent':
+                sent |= notification
+                notification.latency = (now - notification.create_date).total_seconds()
+            else:
+                notification._schedule_retry(mail.failure_reason or _('Error desconegut'))
+                mail.unlink()
+
+        if sent:
+            sent.write({'state': 'sent', 'sent_date': now})
+            for order in sent.sale_order_id:
+                order.message_post(
+                    body=f"El client ha estat notificat per correu de la cancel·lació de la comanda {order.name}.",
+                    message_type='comment',
+                    subtype_xmlid='mail.mt_note'
+                )
+
+    def _schedule_retry(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        values = {'attempts': attempts, 'last_error': error}
+        if attempts >= self._max_attempts:
+            values['state'] = 'failed'
+        else:
+            delay = timedelta(minutes=self._retry_base_minutes * 2 ** (attempts - 1))
+            values['next_attempt'] = fields.Datetime.now() + delay
+        self.write(values)
+
+    # Tornar a posar a la cua les notificacions fallides
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now()})
+        self.env.ref('custom_claims.ir_cron_claim_notifications')._trigger()
+        return True
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import threading
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+
+# Decorador d'instrumentació opcional: desa el temps total, el nombre de
+# consultes SQL i el temps SQL de cada crida. Desactivat, només costa una
+# consulta a la memòria cau del paràmetre `custom_claims.perf_enabled`.
+# Només es desen les crides acabades sense error: després d'una excepció la
+# transacció pot estar avortada i la inserció de la mostra fallaria
+def profiled(operation):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            Sample = self.env['custom.claim.perf.sample']
+            if not Sample._is_enabled():
+                return method(self, *args, **kwargs)
+            cr = self.env.cr
+            thread = threading.current_thread()
+            queries_before = cr.sql_log_count
+            query_time_before = getattr(thread, 'query_time', 0.0)
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            duration = time.perf_counter() - start
+            record_count = len(args[0]) if args and isinstance(args[0], list) else len(self)
+            Sample._record(
+                operation,
+                duration,
+                cr.sql_log_count - queries_before,
+                getattr(thread, 'query_time', 0.0) - query_time_before,
+                record_count,
+            )
+            return result
+        return wrapper
+    return decorator
+
+
+class ClaimPerfSample(models.Model):
+    _name = 'custom.claim.perf.sample'
+    _description = 'Mostra de rendiment de reclamacions'
+    _order = 'id desc'
+    _log_access = False
+
+    operation = fields.Char(string='Operació', required=True, index=True)
+    duration = fields.Float(string='Temps (s)', digits=(16, 6))
+    query_count = fields.Integer(string='Consultes SQL')
+    query_time = fields.Float(string='Temps SQL (s)', digits=(16, 6))
+    record_count = fields.Integer(string='Registres')
+    sample_date = fields.Datetime(string='Data', index=True)
+
+    @api.model
+    @tools.ormcache()
+    def _is_enabled(self):
+        return tools.str2bool(
+            self.env['ir.config_parameter'].sudo().get_param('custom_claims.perf_enabled', 'False'))
+
+    # Una sola inserció directa per crida, sense passar per l'ORM
+    @api.model
+    def _record(self, operation, duration, query_count, query_time, record_count):
+        self.env.cr.execute(
+            """
+            INSERT INTO custom_claim_perf_sample
+                (operation, duration, query_count, query_time, record_count, sample_date)
+            VALUES (%s, %s, %s, %s, %s, now() AT TIME ZONE 'UTC')
+            """,
+            (operation, duration, query_count, query_time, record_count),
+        )
+
+
+class ClaimPerfStat(models.Model):
+    _name = 'custom.claim.perf.stat'
+    _description = 'Estadística de rendiment de reclamacions'
+    _order = 'operation'
+
+    operation = fields.Char(string='Operació', required=True, readonly=True)
+    call_count = fields.Integer(string='Crides', readonly=True)
+    record_count = fields.Integer(string='Registres', readonly=True)
+    duration_avg = fields.Float(string='Mitjana (s)', digits=(16, 6), readonly=True)
+    duration_p50 = fields.Float(string='p50 (s)', digits=(16, 6), readonly=True)
+    duration_p95 = fields.Float(string='p95 (s)', digits=(16, 6), readonly=True)
+    duration_p99 = fields.Float(string='p99 (s)', digits=(16, 6), readonly=True)
+    query_count_avg = fields.Float(string='Consultes per crida', readonly=True)
+    query_count_p95 = fields.Float(string='Consultes p95', readonly=True)
+    query_time_avg = fields.Float(string='Temps SQL mitjà (s)', digits=(16, 6), readonly=True)
+    window_start = fields.Datetime(string='Des de', readonly=True)
+    window_end = fields.Datetime(string='Fins a', readonly=True)
+
+    _sql_constraints = [
+        ('operation_uniq', 'unique(operation)', "Només hi ha una estadística per operació."),
+    ]
+
+    # Cron: recalcular les estadístiques sobre la finestra mòbil de
+    # `custom_claims.perf_window_hours` hores i esborrar les mostres més antigues
+    @api.model
+    def _cron_aggregate(self):
+        hours = int(self.env['ir.config_parameter'].sudo().get_param('custom_claims.perf_window_hours', 24))
+        window_end = fields.Datetime.now()
+        window_start = window_end - timedelta(hours=hours)
+        self.env['custom.claim.perf.sample'].flush_model()
+        self.env.cr.execute(SQL(
+            "DELETE FROM custom_claim_perf_sample WHERE sample_date < %s", window_start))
+        self.env.cr.execute(SQL(
+            """
+            SELECT operation,
+                   COUNT(*),
+                   SUM(record_count),
+                   AVG(duration),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration),
+                   percentile_cont(0.99) WITHIN GROUP (ORDER BY duration),
+                   AVG(query_count),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY query_count),
+                   AVG(query_time)
+              FROM custom_claim_perf_sample
+          GROUP BY operation
+            """
+        ))
+        rows = self.env.cr.fetchall()
+        stats = {stat.operation: stat for stat in self.search([])}
+        to_create = []
+        for operation, *values in rows:
+            vals = dict(zip((
+                'call_count', 'record_count', 'duration_avg', 'duration_p50', 'duration_p95',
+                'duration_p99', 'query_count_avg', 'query_count_p95', 'query_time_avg',
+            ), values), window_start=window_start, window_end=window_end)
+            if operation in stats:
+                stats.pop(operation).write(vals)
+            else:
+                to_create.append(dict(vals, operation=operation))
+        self.create(to_create)
+        # Operacions sense mostres a la finestra
+        self.browse(stat.id for stat in stats.values()).unlink()
+
+    # Exportació en format de text de Prometheus
+    @api.model
+    def _prometheus_text(self):
+        metrics = (
+            # Recomptes sobre la finestra mòbil: poden baixar, per tant són gauge
+            ('custom_claim_calls', 'gauge', 'Crides a la finestra', 'call_count'),
+            ('custom_claim_records', 'gauge', 'Registres processats a la finestra', 'record_count'),
+            ('custom_claim_duration_seconds_avg', 'gauge', 'Temps mitjà per crida', 'duration_avg'),
+            ('custom_claim_duration_seconds_p50', 'gauge', 'Percentil 50 del temps per crida', 'duration_p50'),
+            ('custom_claim_duration_seconds_p95', 'gauge', 'Percentil 95 del temps per crida', 'duration_p95'),
+            ('custom_claim_duration_seconds_p99', 'gauge', 'Percentil 99 del temps per crida', 'duration_p99'),
+            ('custom_claim_sql_queries_avg', 'gauge', 'Consultes SQL mitjanes per crida', 'query_count_avg'),
+            ('custom_claim_sql_queries_p95', 'gauge', 'Percentil 95 de consultes SQL per crida', 'query_count_p95'),
+            ('custom_claim_sql_seconds_avg', 'gauge', 'Temps SQL mitjà per crida', 'query_time_avg'),
+        )
+        stats = self.search([])
+        lines = []
+        for name, metric_type, help_text, field_name in metrics:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for stat in stats:
+                lines.append(f'{name}{{operation="{stat.operation}"}} {stat[field_name]}')
+        return '\n'.join(lines) + '\n'
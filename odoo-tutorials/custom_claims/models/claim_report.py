@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class ClaimReport(models.Model):
+    _name = 'custom.claim.report'
+    _description = 'Anàlisi de reclamacions'
+    # La taula és una vista materialitzada creada a init()
+    _auto = False
+    _order = 'create_date desc'
+
+    name = fields.Char(string='Referència', readonly=True)
+    state = fields.Selection(
+        selection=[
+            ('new', 'Nova'),
+            ('in_progress', 'En tractament'),
+            ('closed', 'Tancada'),
+            ('canceled', 'Cancel·lada')],
+        string='Estat',
+        readonly=True
+    )
+    partner_id = fields.Many2one('res.partner', string='Client', readonly=True)
+    user_id = fields.Many2one('res.users', string='Responsable', readonly=True)
+    sale_order_id = fields.Many2one('sale.order', string='Comanda', readonly=True)
+    closure_reason_id = fields.Many2one('custom.closure.reason', string='Motiu tancament', readonly=True)
+    create_date = fields.Datetime(string='Data creació', readonly=True)
+    close_date = fields.Datetime(string='Data tancament', readonly=True)
+    days_to_close = fields.Float(string='Dies fins al tancament', readonly=True, aggregator='avg')
+    message_count = fields.Integer(string='Missatges', readonly=True)
+    nbr = fields.Integer(string='# Reclamacions', readonly=True)
+
+    def _query(self):
+        return SQL(
+            """
+            SELECT claim.id,
+                   claim.name,
+                   claim.state,
+                   claim.partner_id,
+                   claim.user_id,
+                   claim.sale_order_id,
+                   claim.closure_reason_id,
+                   claim.create_date,
+                   claim.close_date,
+                   CASE WHEN claim.close_date IS NOT NULL
+                        THEN EXTRACT(EPOCH FROM claim.close_date - claim.create_date) / 86400.0
+                   END AS days_to_close,
+                   COALESCE(msg.message_count, 0) AS message_count,
+                   1 AS nbr
+              FROM custom_claim claim
+         LEFT JOIN (
+                    SELECT claim_id, COUNT(*) AS message_count
+                      FROM custom_claim_message
+                  GROUP BY claim_id
+                   ) msg ON msg.claim_id = claim.id
+             UNION ALL
+            -- Reclamacions arxivades, amb identificador negatiu per no
+            -- coincidir amb les vives
+            SELECT -archive.id,
+                   archive.name,
+                   archive.state,
+                   archive.partner_id,
+                   archive.user_id,
+                   archive.sale_order_id,
+                   archive.closure_reason_id,
+                   archive.claim_create_date,
+                   archive.close_date,
+                   CASE WHEN archive.close_date IS NOT NULL
+                        THEN EXTRACT(EPOCH FROM archive.close_date - archive.claim_create_date) / 86400.0
+                   END,
+                   COALESCE(archive.message_count, 0),
+                   1
+              FROM custom_claim_archive archive
+            """
+        )
+
+    def init(self):
+        # La vista només es torna a crear si no existeix o si n'ha canviat la
+        # definició: en cada actualització del mòdul es conserven les dades
+        cr = self.env.cr
+        Checkpoint = self.env['custom.claim.checkpoint']
+        definition = hashlib.sha256(self._query().code.encode()).hexdigest()
+        cr.execute("SELECT 1 FROM pg_matviews WHERE matviewname = %s", [self._table])
+        if cr.rowcount and Checkpoint._get_value('report_definition') == definition:
+            return
+        cr.execute(SQL("DROP MATERIALIZED VIEW IF EXISTS %s CASCADE", SQL.identifier(self._table)))
+        cr.execute(SQL("CREATE MATERIALIZED VIEW %s AS (%s)", SQL.identifier(self._table), self._query()))
+        # L'índex únic permet refrescar la vista sense bloquejar les lectures
+        cr.execute(SQL(
+            "CREATE UNIQUE INDEX %s ON %s (id)",
+            SQL.identifier(f'{self._table}_id_uniq'),
+            SQL.identifier(self._table),
+        ))
+        Checkpoint._set_value('report_definition', definition)
+        Checkpoint._set_value('report_refresh', self._get_refresh_marker())
+
+    # Marca de canvis de les taules d'origen: data de l'última modificació i
+    # nombre de files de cada taula. Les insercions i modificacions mouen la
+    # data i les eliminacions el recompte
+    def _get_refresh_marker(self):
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT (SELECT MAX(write_date) FROM custom_claim),
+                   (SELECT COUNT(*) FROM custom_claim),
+                   (SELECT MAX(write_date) FROM custom_claim_message),
+                   (SELECT COUNT(*) FROM custom_claim_message),
+                   (SELECT MAX(write_date) FROM custom_claim_archive),
+                   (SELECT COUNT(*) FROM custom_claim_archive)
+        """)
+        return '|'.join(str(value) for value in self.env.cr.fetchone())
+
+    # Cron: refrescar la vista només si les dades d'origen han canviat des de l'últim refresc
+    @api.model
+    def _cron_refresh(self):
+        Checkpoint = self.env['custom.claim.checkpoint']
+        marker = self._get_refresh_marker()
+        if marker == Checkpoint._get_value('report_refresh'):
+            return
+        self.env.cr.execute(SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY %s", SQL.identifier(self._table)))
+        Checkpoint._set_value('report_refresh', marker)
+        self.env.invalidate_all()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields
+from odoo import models, fields, api, tools
+from odoo.tools import frozendict
 
 class ClosureReason(models.Model):
     _name = 'custom.closure.reason'
@@ -9,4 +10,59 @@ class ClosureReason(models.Model):
 
     name = fields.Char('Motiu', required=True, translate=True)
     code = fields.Char('Codi', required=True, size=10)
-    active = fields.Boolean('Actiu', default=True)
\ No newline at end of file
+    active = fields.Boolean('Actiu', default=True)
+
+    # Taula petita i gairebé estàtica: tots els motius per idioma en memòria
+    # cau. Si dos motius comparteixen codi, guanya l'actiu i després el més antic
+    @api.model
+    @tools.ormcache('self.env.lang')
+    def _get_reason_data(self):
+        reasons = self.sudo().with_context(active_test=False).search_fetch(
+            [], ['code', 'name', 'active'], order='active desc, id')
+        data = {}
+        for reason in reasons:
+            data.setdefault(reason.code, (reason.id, reason.name, reason.active))
+        return frozendict(data)
+
+    # Diccionari codi -> id per a importacions i integracions
+    @api.model
+    def _get_code_map(self, active_test=True):
+        return {
+            code: reason_id
+            for code, (reason_id, _name, active) in self._get_reason_data().items()
+            if active or not active_test
+        }
+
+    # Id del motiu amb aquest codi, o False si no existeix (o està arxivat)
+    @api.model
+    def _lookup_code(self, code, active_test=True):
+        reason_id, _name, active = self._get_reason_data().get(code, (False, False, False))
+        return reason_id if active or not active_test else False
+
+    # Nom traduït a l'idioma de l'entorn
+    @api.model
+    def _get_name_by_code(self, code):
+        return self._get_reason_data().get(code, (False, False, False))[1]
+
+    # Qualsevol canvi buida la memòria cau de tots els treballadors
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    # Les traduccions editades des del diàleg no passen per write()
+    def update_field_translations(self, field_name, translations, *args, **kwargs):
+        res = super().update_field_translations(field_name, translations, *args, **kwargs)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
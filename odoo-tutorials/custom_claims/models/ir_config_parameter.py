@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrConfigParameter(models.Model):
+    _inherit = 'ir.config_parameter'
+
+    # Mentre el mode emmagatzemat està desactivat els ganxos de factures i
+    # enviaments no mantenen les columnes: en activar-lo es recalculen totes
+    @api.model_create_multi
+    def create(self, vals_list):
+        was_stored = self.env['custom.claim']._use_stored_invoice_shipment()
+        records = super().create(vals_list)
+        if any(vals.get('key') == 'custom_claims.stored_invoice_shipment' for vals in vals_list):
+            self._refresh_stored_invoice_shipment(was_stored)
+        return records
+
+    def write(self, vals):
+        was_stored = self.env['custom.claim']._use_stored_invoice_shipment()
+        res = super().write(vals)
+        if 'custom_claims.stored_invoice_shipment' in self.mapped('key'):
+            self._refresh_stored_invoice_shipment(was_stored)
+        return res
+
+    @api.model
+    def _refresh_stored_invoice_shipment(self, was_stored):
+        Claim = self.env['custom.claim']
+        if not was_stored and Claim._use_stored_invoice_shipment():
+            claims = Claim.sudo().search([])
+            for fname in ('stored_invoice_count', 'stored_shipment_count'):
+                self.env.add_to_compute(Claim._fields[fname], claims)
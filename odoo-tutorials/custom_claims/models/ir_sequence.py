@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    # Reservar un bloc de `count` números d'una seqüència amb una sola sentència,
+    # en lloc d'una crida (i un bloqueig de fila si és sense forats) per número
+    @api.model
+    def _next_block_by_code(self, sequence_code, count, sequence_date=None):
+        self.check_access('read')
+        company_id = self.env.company.id
+        sequence = self.search(
+            [('code', '=', sequence_code), ('company_id', 'in', [company_id, False])],
+            order='company_id',
+            limit=1,
+        )
+        if not sequence:
+            return []
+        return sequence.sudo()._next_block(count, sequence_date=sequence_date)
+
+    def _next_block(self, count, sequence_date=None):
+        self.ensure_one()
+        # Les seqüències per rangs de dates mantenen el comportament estàndard
+        if self.use_date_range:
+            return [self._next(sequence_date=sequence_date) for _i in range(count)]
+
+        if self.implementation == 'standard':
+            # Els números són únics però, amb altres treballadors concurrents,
+            # poden no ser consecutius (una seqüència estàndard ja admet forats)
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % self.id, count),
+            )
+            numbers = [row[0] for row in self.env.cr.fetchall()]
+        else:
+            # Sense forats: un sol bloqueig i una sola actualització per tot el bloc
+            self.flush_recordset(['number_next'])
+            self.env.cr.execute(
+                "SELECT number_next FROM ir_sequence WHERE id = %s FOR UPDATE NOWAIT",
+                (self.id,),
+            )
+            number_next = self.env.cr.fetchone()[0]
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s",
+                (self.number_increment * count, self.id),
+            )
+            self.invalidate_recordset(['number_next'])
+            numbers = [number_next + i * self.number_increment for i in range(count)]
+        return [self.get_next_char(number) for number in numbers]
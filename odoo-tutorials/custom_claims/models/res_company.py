@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields
+
+
+class ResCompany(models.Model):
+    _inherit = 'res.company'
+
+    # Reservar les referències de reclamació en bloc per a cada creació múltiple
+    claim_sequence_block = fields.Boolean(
+        string='Reserva de referències en bloc',
+        default=True,
+        help="Reserva tots els números REC d'una creació múltiple amb una sola sentència"
+    )
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    claim_ids = fields.One2many(
+        comodel_name='custom.claim',
+        inverse_name='partner_id',
+        string='Reclamacions'
+    )
+    # Reclamacions de l'empresa i de tots els seus contactes
+    commercial_claim_ids = fields.One2many(
+        comodel_name='custom.claim',
+        inverse_name='commercial_partner_id',
+        string='Reclamacions de l\'empresa'
+    )
+    commercial_claim_archive_ids = fields.One2many(
+        comodel_name='custom.claim.archive',
+        inverse_name='commercial_partner_id',
+        string='Reclamacions arxivades de l\'empresa'
+    )
+    # Comptadors agregats de totes les comandes de l'entitat comercial del
+    # client, emmagatzemats; els contactes mostren els de la seva empresa
+    claim_count = fields.Integer(
+        string='Reclamacions',
+        compute='_compute_claim_stats',
+        store=True
+    )
+    open_claim_count = fields.Integer(
+        string='Reclamacions obertes',
+        compute='_compute_claim_stats',
+        store=True,
+        index=True  # Filtres i ordenació de clients per reclamacions obertes
+    )
+    last_claim_date = fields.Datetime(
+        string='Última reclamació',
+        compute='_compute_claim_stats',
+        store=True
+    )
+
+    @api.depends(
+        'commercial_partner_id',
+        'commercial_partner_id.commercial_claim_ids.state',
+        'commercial_partner_id.commercial_claim_ids.create_date',
+        'commercial_partner_id.commercial_claim_archive_ids',
+    )
+    def _compute_claim_stats(self):
+        stats = self.env['custom.claim']._get_claim_stats('commercial_partner_id', self.commercial_partner_id.ids)
+        for partner in self:
+            partner.claim_count, partner.open_claim_count, partner.last_claim_date = stats.get(
+                partner.commercial_partner_id.id, (0, 0, False))
+
+    def action_view_claims(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Reclamacions'),
+            'res_model': 'custom.claim',
+            'view_mode': 'list,form',
+            'domain': [('commercial_partner_id', '=', self.commercial_partner_id.id)],
+        }
@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, api, _
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
@@ -8,4 +8,43 @@ class SaleOrder(models.Model):
         inverse_name='sale_order_id',
         string='Reclamacions',
         copy=False
-    )
\ No newline at end of file
+    )
+    claim_archive_ids = fields.One2many(
+        comodel_name='custom.claim.archive',
+        inverse_name='sale_order_id',
+        string='Reclamacions arxivades'
+    )
+    # Comptadors emmagatzemats: es recalculen per lots quan canvien les reclamacions
+    claim_count = fields.Integer(
+        string='Reclamacions',
+        compute='_compute_claim_stats',
+        store=True
+    )
+    open_claim_count = fields.Integer(
+        string='Reclamacions obertes',
+        compute='_compute_claim_stats',
+        store=True,
+        index=True  # Filtres i ordenació per reclamacions obertes
+    )
+    last_claim_date = fields.Datetime(
+        string='Última reclamació',
+        compute='_compute_claim_stats',
+        store=True
+    )
+
+    @api.depends('claim_ids.state', 'claim_ids.create_date', 'claim_archive_ids')
+    def _compute_claim_stats(self):
+        stats = self.env['custom.claim']._get_claim_stats('sale_order_id', self.ids)
+        for order in self:
+            order.claim_count, order.open_claim_count, order.last_claim_date = stats.get(order.id, (0, 0, False))
+
+    def action_view_claims(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Reclamacions'),
+            'res_model': 'custom.claim',
+            'view_mode': 'list,form',
+            'domain': [('sale_order_id', '=', self.id)],
+            'context': {'default_sale_order_id': self.id},
+        }
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+from odoo.tools import SQL
+
+
+class StockPicking(models.Model):
+    _inherit = 'stock.picking'
+
+    # Mantenir els comptadors emmagatzemats de les reclamacions. L'estat de
+    # l'albarà és calculat: els canvis d'estat arriben per stock.move.write.
+    # Si el mode emmagatzemat està desactivat no es buida res ni es consulta res
+    @api.model_create_multi
+    def create(self, vals_list):
+        pickings = super().create(vals_list)
+        Claim = self.env['custom.claim']
+        if Claim._use_stored_invoice_shipment():
+            Claim._mark_invoice_shipment_to_recompute(SQL("SELECT unnest(%s::int[])", pickings.sale_id.ids))
+        return pickings
+
+    def write(self, vals):
+        Claim = self.env['custom.claim']
+        if 'sale_id' not in vals or not Claim._use_stored_invoice_shipment():
+            return super().write(vals)
+        orders = self.sale_id
+        res = super().write(vals)
+        Claim._mark_invoice_shipment_to_recompute(SQL("SELECT unnest(%s::int[])", (orders | self.sale_id).ids))
+        return res
+
+    def unlink(self):
+        Claim = self.env['custom.claim']
+        if not Claim._use_stored_invoice_shipment():
+            return super().unlink()
+        order_ids = self.sale_id.ids
+        res = super().unlink()
+        Claim._mark_invoice_shipment_to_recompute(SQL("SELECT unnest(%s::int[])", order_ids))
+        return res
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def write(self, vals):
+        res = super().write(vals)
+        Claim = self.env['custom.claim']
+        if 'state' in vals and Claim._use_stored_invoice_shipment():
+            Claim._mark_invoice_shipment_to_recompute(
+                SQL("SELECT unnest(%s::int[])", self.picking_id.sale_id.ids))
+        return res
@@ -0,0 +1,11 @@
+from . import test_claim
+from . import test_claim_performance
+from . import test_claim_notification
+from . import test_claim_import
+from . import test_claim_archive
+from . import test_claim_cancel_job
+from . import test_closure_reason
+from . import test_claim_sla
+from . import test_claim_perf_stats
+from . import test_claim_duplicates
+from . import test_claim_api
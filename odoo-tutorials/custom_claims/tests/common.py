@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import socketserver
+import tempfile
+import time
+from contextlib import contextmanager
+
+from odoo import Command, fields
+from odoo.tests import TransactionCase
+
+
+# Volums de dades configurables per variables d'entorn
+def _volume(name, default):
+    return int(os.environ.get(name, default))
+
+
+class ClaimCase(TransactionCase):
+    """Base de les proves funcionals: uns quants clients i comandes."""
+
+    partner_count = 2
+    order_count = 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Les dades de base es creen sense seguiment ni missatges de chatter
+        seed_env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_create_nolog=True))
+        cls.partners = seed_env['res.partner'].create([{
+            'name': f'Client reclamacions {i}',
+            'email': f'client{i}@example.com',
+        } for i in range(cls.partner_count)])
+        cls.product = seed_env['product.product'].create({
+            'name': 'Producte reclamacions',
+            'type': 'consu',
+            'list_price': 10.0,
+            'invoice_policy': 'order',
+        })
+        cls.user = seed_env['res.users'].create({
+            'name': 'Responsable reclamacions',
+            'login': 'claim_test_user',
+            'email': 'claim_test_user@example.com',
+            'groups_id': [Command.set([
+                cls.env.ref('base.group_user').id,
+                cls.env.ref('sales_team.group_sale_salesman_all_leads').id,
+                cls.env.ref('stock.group_stock_user').id,
+            ])],
+        })
+        cls.orders = cls._create_orders(cls.order_count)
+
+    @classmethod
+    def _create_orders(cls, count):
+        seed_env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_create_nolog=True))
+        return seed_env['sale.order'].create([{
+            'partner_id': cls.partners[i % len(cls.partners)].id,
+            'user_id': cls.user.id,
+            'order_line': [Command.create({'product_id': cls.product.id, 'product_uom_qty': 1})],
+        } for i in range(count)])
+
+    # Reclamacions obertes: com a màxim una per comanda
+    def _create_open_claims(self, orders):
+        return self.env['custom.claim'].create([{
+            'subject': f'Reclamació {order.name}',
+            'description': 'Descripció de la reclamació',
+            'sale_order_id': order.id,
+            'user_id': self.user.id,
+        } for order in orders])
+
+    # Reclamacions obertes amb el termini de l'SLA vençut fa tres dies
+    def _create_overdue_claims(self, orders):
+        claims = self._create_open_claims(orders)
+        claims.flush_recordset()
+        # Envellir les reclamacions directament: les dates no són editables
+        self.cr.execute(
+            "UPDATE custom_claim SET create_date = create_date - interval '3 days', "
+            "state_date = state_date - interval '3 days', "
+            "sla_deadline = sla_deadline - interval '3 days' WHERE id = ANY(%s)",
+            [claims.ids],
+        )
+        claims.invalidate_recordset()
+        return claims
+
+
+class ClaimPerformanceCase(ClaimCase):
+    """Base de les proves de rendiment: sembra dades i mesura consultes i temps.
+
+    Els resultats de cada execució s'afegeixen al fitxer JSON indicat per
+    CLAIM_PERF_OUTPUT per poder comparar execucions al llarg del temps.
+    """
+
+    partner_count = 20
+
+    @classmethod
+    def setUpClass(cls):
+        cls.order_count = cls.order_volume = _volume('CLAIM_PERF_ORDERS', 200)
+        cls.claim_volume = _volume('CLAIM_PERF_CLAIMS', 10000)
+        cls.message_volume = _volume('CLAIM_PERF_MESSAGES', 2000)
+        cls.results = []
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.results:
+            cls._write_results()
+        super().tearDownClass()
+
+    @contextmanager
+    def measure(self, label, volume=1, budget=None):
+        """Mesura consultes SQL i temps d'un bloc i el compara amb un pressupost.
+
+        ``budget`` és una parella (consultes fixes, consultes per registre).
+        """
+        stats = {'label': label, 'volume': volume}
+        self.env.flush_all()
+        queries_before = self.cr.sql_log_count
+        start = time.perf_counter()
+        yield stats
+        self.env.flush_all()
+        stats['seconds'] = time.perf_counter() - start
+        stats['queries'] = self.cr.sql_log_count - queries_before
+        stats['per_second'] = volume / stats['seconds'] if stats['seconds'] else None
+        type(self).results.append(stats)
+        if budget is not None:
+            fixed, per_record = budget
+            self.assertLessEqual(
+                stats['queries'], fixed + per_record * volume,
+                f"{label}: {stats['queries']} consultes per a {volume} registres")
+
+    @classmethod
+    def _write_results(cls):
+        path = os.environ.get('CLAIM_PERF_OUTPUT') or os.path.join(tempfile.gettempdir(), 'custom_claims_perf.json')
+        runs = []
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as result_file:
+                runs = json.load(result_file)
+        runs.append({
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'database': cls.env.cr.dbname,
+            'case': cls.__name__,
+            'volumes': {
+                'orders': cls.order_volume,
+                'claims': cls.claim_volume,
+                'messages': cls.message_volume,
+            },
+            'results': cls.results,
+        })
+        with open(path, 'w', encoding='utf-8') as result_file:
+            json.dump(runs, result_file, indent=2)
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Servidor SMTP local mínim que respon amb retard a cada ordre."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connections = 0
+        self.messages = []
+        super().__init__(('127.0.0.1', 0), _FakeSMTPHandler)
+
+
+class _FakeSMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        time.sleep(self.server.delay)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self._reply('220 localhost ESMTP')
+        for line in self.rfile:
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self._reply('250 localhost')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line.rstrip(b'\r\n') == b'.':
+                        break
+                    data.append(data_line)
+                self.server.messages.append(b''.join(data))
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaim(ClaimCase):
+
+    def test_check_open_claims_conflict(self):
+        claims = self._create_open_claims(self.orders[:2])
+        with self.assertRaisesRegex(ValidationError, claims[0].sale_order_id.name), self.cr.savepoint():
+            self._create_open_claims(claims.sale_order_id)
+        # Dues reclamacions noves per a la mateixa comanda dins d'un sol lot
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            self._create_open_claims([self.orders[2], self.orders[2]])
+        # Reobrir una reclamació tancada d'una comanda que ja en té una d'oberta
+        closed = self.env['custom.claim'].create({
+            'subject': 'Reclamació tancada',
+            'description': 'Descripció',
+            'sale_order_id': claims[1].sale_order_id.id,
+            'state': 'closed',
+        })
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            closed.write({'state': 'new'})
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            claims[1].write({'sale_order_id': claims[0].sale_order_id.id})
+
+    def test_stored_invoice_shipment(self):
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.stored_invoice_shipment', 'True')
+        orders = self.orders[:2]
+        orders.action_confirm()
+        orders._create_invoices()
+        claims = self._create_open_claims(orders)
+        self.assertTrue(all(claim.invoice_count and claim.shipment_count for claim in claims))
+
+        # Els canvis d'estat de factures i enviaments actualitzen les columnes
+        orders.invoice_ids.button_cancel()
+        orders.picking_ids.action_cancel()
+        self.env.flush_all()
+        self.assertEqual(set(claims.mapped('stored_invoice_count')), {0})
+        self.assertEqual(set(claims.mapped('shipment_count')), {0})
+
+    def test_stored_invoice_shipment_disabled(self):
+        orders = self.orders[:2]
+        claims = self._create_open_claims(orders)
+        # Amb el mode desactivat els ganxos no marquen res per recalcular
+        Claim = type(self.env['custom.claim'])
+        with patch.object(Claim, '_mark_invoice_shipment_to_recompute') as mark:
+            orders.action_confirm()
+            orders._create_invoices()
+            self.env.flush_all()
+        mark.assert_not_called()
+        self.assertEqual(set(claims.mapped('stored_shipment_count')), {0})
+        self.assertTrue(all(claim.invoice_count and claim.shipment_count for claim in claims))
+
+        # En activar-lo es recalculen les columnes desfasades
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.stored_invoice_shipment', 'True')
+        self.env.flush_all()
+        self.assertTrue(all(claim.stored_invoice_count and claim.stored_shipment_count for claim in claims))
+
+    def test_claim_stats_counters(self):
+        orders = self.orders
+        partners = orders.partner_id
+        claims = self._create_open_claims(orders)
+        self.assertEqual(set(orders.mapped('open_claim_count')), {1})
+        self.assertEqual(set(orders.mapped('claim_count')), {1})
+        self.assertEqual(sum(partners.mapped('open_claim_count')), len(claims))
+        self.assertEqual(orders[0].last_claim_date, claims[0].create_date)
+
+        claims.action_close()
+        self.assertEqual(set(orders.mapped('open_claim_count')), {0})
+        self.assertEqual(set(partners.mapped('open_claim_count')), {0})
+        self.assertEqual(sum(partners.mapped('claim_count')), len(claims))
+
+        claims.unlink()
+        self.assertEqual(set(orders.mapped('claim_count')), {0})
+        self.assertFalse(orders[0].last_claim_date)
+
+    def test_partner_stats_by_commercial_partner(self):
+        company = self.env['res.partner'].create({'name': 'Empresa client', 'is_company': True})
+        contacts = self.env['res.partner'].create([
+            {'name': f'Contacte {i}', 'parent_id': company.id} for i in range(2)])
+        orders = self.env['sale.order'].create([{
+            'partner_id': contact.id,
+            'order_line': [Command.create({'product_id': self.product.id, 'product_uom_qty': 1})],
+        } for contact in contacts])
+        claims = self._create_open_claims(orders)
+        self.assertEqual(claims.commercial_partner_id, company)
+        # L'empresa suma les reclamacions dels contactes i cada contacte en mostra el total
+        self.assertEqual(company.open_claim_count, 2)
+        self.assertEqual(contacts.mapped('open_claim_count'), [2, 2])
+        claims[0].action_close()
+        self.assertEqual((company.claim_count, company.open_claim_count), (2, 1))
+        self.assertEqual(
+            company.action_view_claims()['domain'], contacts[0].action_view_claims()['domain'])
+
+    def test_message_read_page(self):
+        claim = self._create_open_claims(self.orders[:1])
+        self.env['custom.claim.message'].create([
+            {'claim_id': claim.id, 'content': f'Missatge {i}'} for i in range(45)])
+        Message = self.env['custom.claim.message']
+        seen, cursor = [], None
+        while True:
+            page = Message.read_page(claim.id, before=cursor, limit=20)
+            seen += [message['id'] for message in page['messages']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, Message.search([('claim_id', '=', claim.id)]).ids)
+
+    def test_load_older_messages(self):
+        claim = self._create_open_claims(self.orders[:1])
+        self.env['custom.claim.message'].create([
+            {'claim_id': claim.id, 'content': f'Missatge {i}'} for i in range(45)])
+        messages = self.env['custom.claim.message'].search([('claim_id', '=', claim.id)])
+        # El formulari avança pel fil amb el cursor de read_page
+        pages = []
+        while claim:
+            pages.append(claim.recent_message_ids)
+            action = claim.action_load_older_messages()
+            claim = action and claim.with_context(action['context'])
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(sum(pages, self.env['custom.claim.message']), messages)
+
+    def test_text_search(self):
+        claims = self._create_open_claims(self.orders[:2])
+        self.env['custom.claim.message'].create([
+            {'claim_id': claims[0].id, 'content': "El paquet va arribar amb l'embalatge trencat"},
+            {'claim_id': claims[1].id, 'content': 'Descompte del 100% no aplicat'},
+        ])
+        Claim = self.env['custom.claim']
+        self.assertEqual(Claim.search([('text_search', 'ilike', 'embalatge')]), claims[0])
+        self.assertEqual(Claim.search([('text_search', 'ilike', '100%')]), claims[1])
+        # Els comodins de LIKE del text de l'usuari es cerquen literalment
+        self.assertFalse(Claim.search([('text_search', 'ilike', '%_%')]))
+
+    def test_bulk_mode_skips_followers(self):
+        claims = self._create_open_claims(self.orders)
+        other_user = self.user.copy({'name': 'Responsable nou', 'login': 'claim_test_other'})
+        followers = claims.message_follower_ids
+        claims.with_context(claim_bulk_mode=True).write({'user_id': other_user.id})
+        self.assertEqual(claims.user_id, other_user)
+        self.assertEqual(claims.message_follower_ids, followers)
+        self.assertFalse(self.env['mail.mail'].search([('recipient_ids', 'in', other_user.partner_id.ids)]))
+
+    def test_report_refresh(self):
+        Report = self.env['custom.claim.report']
+        Checkpoint = self.env['custom.claim.checkpoint']
+        # Una actualització del mòdul sense canvis de definició conserva la vista
+        self.cr.execute("SELECT %s::regclass::oid", [Report._table])
+        oid = self.cr.fetchone()[0]
+        Report.init()
+        self.cr.execute("SELECT %s::regclass::oid", [Report._table])
+        self.assertEqual(self.cr.fetchone()[0], oid)
+
+        Report._cron_refresh()
+        marker = Checkpoint._get_value('report_refresh')
+        claims = self._create_open_claims(self.orders[:2])
+        self.assertNotEqual(Report._get_refresh_marker(), marker)
+        Report._cron_refresh()
+        self.assertEqual(Report.search_count([('name', 'in', claims.mapped('name'))]), 2)
+        self.assertEqual(Checkpoint._get_value('report_refresh'), Report._get_refresh_marker())
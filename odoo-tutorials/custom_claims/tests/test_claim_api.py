@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from odoo.addons.custom_claims.controllers.claims_api import take_token
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimApi(ClaimCase):
+
+    def test_intake_batch(self):
+        Api = self.env['custom.claim.api']
+        rows = [{
+            'subject': f'Reclamació API {i}',
+            'description': 'Rebuda per API',
+            'sale_order': order.name,
+        } for i, order in enumerate(self.orders)]
+        rows[1]['sale_order'] = 'DESCONEGUDA'
+        result = Api._intake(rows, [])
+        claims_result = result['claims']
+        self.assertIn('error', claims_result[1])
+        references = [item['reference'] for item in claims_result if 'reference' in item]
+        self.assertEqual(len(references), len(rows) - 1)
+
+        messages = [{'claim': reference, 'content': 'Seguiment'} for reference in references]
+        messages.append({'claim': 'REC-INEXISTENT', 'content': 'Perdut'})
+        result = Api._intake([], messages)
+        self.assertEqual(sum(1 for item in result['messages'] if 'id' in item), len(references))
+        self.assertIn('error', result['messages'][-1])
+
+    def test_intake_claim_history(self):
+        Api = self.env['custom.claim.api']
+        order = self.orders[0]
+        rows = [{'subject': f'Reclamació API {i}', 'description': 'Rebuda per API', 'sale_order': order.name}
+                for i in range(2)]
+        result = Api._intake(rows, [])['claims']
+        # La segona obriria una altra reclamació per a la mateixa comanda: el
+        # client rep el missatge de validació
+        self.assertIn(order.name, result[1]['error'])
+        claim = self.env['custom.claim'].browse(result[0]['id'])
+        self.assertTrue(claim.message_ids)
+        self.assertTrue(claim.duplicate_checked)
+
+    @mute_logger('odoo.addons.custom_claims.models.claim_api')
+    def test_intake_hides_internal_errors(self):
+        Api = self.env['custom.claim.api']
+        Message = type(self.env['custom.claim.message'])
+        claim = self._create_open_claims(self.orders[:1])
+        with patch.object(Message, 'create', side_effect=ValueError('detall intern')):
+            result = Api._intake([], [{'claim': claim.name, 'content': 'Seguiment'}])
+        self.assertNotIn('detall intern', result['messages'][0]['error'])
+
+    def test_status_validator(self):
+        Api = self.env['custom.claim.api']
+        claims = self._create_open_claims(self.orders)
+        references = claims.mapped('name')
+        self.env.flush_all()
+        etag, last_modified = Api._status_validator(references)
+        self.assertEqual(last_modified, max(claims.mapped('write_date')))
+        self.assertEqual(Api._status_validator(list(reversed(references)))[0], etag)
+
+        status = Api._status(references + ['REC-INEXISTENT'])
+        self.assertEqual(len(status['claims']), len(claims))
+        self.assertEqual(status['unknown'], ['REC-INEXISTENT'])
+
+        claims[:1].action_close()
+        self.env.flush_all()
+        self.assertNotEqual(Api._status_validator(references)[0], etag)
+
+    def test_token_bucket(self):
+        key = ('test_token_bucket', self.env.uid)
+        waits = [take_token(key, rate=1, burst=5) for _i in range(6)]
+        self.assertEqual(waits[:5], [0] * 5)
+        self.assertGreater(waits[5], 0)
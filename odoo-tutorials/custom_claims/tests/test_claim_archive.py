@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimArchive(ClaimCase):
+
+    def _create_old_closed_claims(self, orders):
+        claims = self._create_open_claims(orders)
+        self.env['custom.claim.message'].create([
+            {'claim_id': claim.id, 'content': f'Missatge {i}'} for claim in claims for i in range(3)])
+        claims.action_close()
+        claims.write({'close_date': fields.Datetime.now() - timedelta(days=400)})
+        return claims
+
+    def test_archive_and_reopen(self):
+        claims = self._create_old_closed_claims(self.orders)
+        names = claims.mapped('name')
+        history = self.env['mail.message'].search([('model', '=', 'custom.claim'), ('res_id', 'in', claims.ids)])
+        self.assertTrue(history)
+        counters = {order: (order.claim_count, order.last_claim_date) for order in self.orders}
+        Archive = self.env['custom.claim.archive']
+        Archive._cron_archive_claims(batch_size=len(claims))
+        self.assertFalse(claims.exists())
+        archives = Archive.search([('name', 'in', names)])
+        self.assertEqual(len(archives), len(claims))
+        self.assertEqual(set(archives.mapped('message_count')), {3})
+        self.assertFalse(self.env['custom.claim.message'].search_count([('claim_id', 'in', claims.ids)]))
+        # El chatter passa a l'arxiu i els comptadors i l'informe les segueixen comptant
+        self.assertEqual(history.exists(), history)
+        self.assertEqual(set(history.mapped('model')), {'custom.claim.archive'})
+        self.assertEqual({order: (order.claim_count, order.last_claim_date) for order in self.orders}, counters)
+        self.env.flush_all()
+        self.cr.execute(SQL(
+            "SELECT COUNT(*) FROM (%s) report WHERE name = ANY(%s)",
+            self.env['custom.claim.report']._query(), names,
+        ))
+        self.assertEqual(self.cr.fetchone()[0], len(names))
+
+        archive = archives[0]
+        name, claim_date = archive.name, archive.claim_create_date
+        archive_history = archive.message_ids
+        self.assertTrue(archive_history)
+        action = archive.action_reopen()
+        restored = self.env['custom.claim'].browse(action['res_id'])
+        self.assertFalse(archive.exists())
+        self.assertEqual(restored.name, name)
+        self.assertEqual(restored.state, 'in_progress')
+        self.assertEqual(restored.create_date, claim_date)
+        self.assertEqual(len(restored.message_ids), 3)
+        self.assertEqual(set(archive_history.mapped('model')), {'custom.claim'})
+        self.assertEqual(set(archive_history.mapped('res_id')), {restored.id})
+        self.assertEqual(restored.sale_order_id.claim_count, counters[restored.sale_order_id][0])
+
+    def test_archive_keeps_recent_claims(self):
+        claims = self._create_open_claims(self.orders)
+        claims.action_close()
+        self.env['custom.claim.archive']._cron_archive_claims()
+        self.assertEqual(len(claims.exists()), len(self.orders))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from psycopg2 import errorcodes
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimCancelJob(ClaimCase):
+
+    order_count = 6
+
+    def _start_job(self, claims, **vals):
+        action = claims.action_mass_cancel_order()
+        job = self.env['custom.claim.cancel.job'].browse(action['res_id'])
+        job.write(dict({'chunk_size': 2}, **vals))
+        job.action_start()
+        return job
+
+    def test_mass_cancel_job(self):
+        claims = self._create_open_claims(self.orders)
+        job = self._start_job(claims)
+        self.assertEqual(job.total_count, len(claims))
+
+        self.env['custom.claim.cancel.job']._cron_process_jobs(threaded=False)
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.done_count, len(claims))
+        self.assertEqual(set(claims.mapped('state')), {'canceled'})
+        self.assertEqual(set(claims.sale_order_id.mapped('state')), {'cancel'})
+
+    def test_mass_cancel_job_workers(self):
+        # En mode de prova, els cursors dels treballadors comparteixen la
+        # connexió de la prova i s'executen un darrere l'altre
+        claims = self._create_open_claims(self.orders)
+        job = self._start_job(claims, worker_count=3)
+        self.env.flush_all()
+
+        job._run_workers(time.monotonic() + 60)
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.done_count, len(claims))
+        self.assertEqual(set(claims.mapped('state')), {'canceled'})
+
+    def test_failed_line_backoff(self):
+        claims = self._create_open_claims(self.orders)
+        job = self._start_job(claims, max_attempts=2)
+        failing = job.line_ids.filtered(lambda line: line.claim_id == claims[0])
+        Line = type(failing)
+        cancel_claims = Line._cancel_claims
+
+        def _cancel_claims(lines):
+            if failing in lines:
+                raise UserError('Reclamació bloquejada')
+            return cancel_claims(lines)
+
+        Job = self.env['custom.claim.cancel.job']
+        with patch.object(Line, '_cancel_claims', _cancel_claims):
+            Job._cron_process_jobs(threaded=False)
+            self.assertEqual(failing.state, 'pending')
+            self.assertEqual(failing.attempts, 1)
+            self.assertGreater(failing.next_attempt, fields.Datetime.now())
+            self.assertEqual(job.state, 'running')
+
+            # Abans del termini d'espera la línia no es torna a agafar
+            Job._cron_process_jobs(threaded=False)
+            self.assertEqual(failing.attempts, 1)
+
+            failing.next_attempt = fields.Datetime.now() - timedelta(seconds=1)
+            Job._cron_process_jobs(threaded=False)
+        self.assertEqual(failing.state, 'failed')
+        self.assertEqual(failing.attempts, 2)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.done_count, len(claims) - 1)
+
+    def test_worker_retries_concurrency_errors(self):
+        class ConcurrencyError(Exception):
+            pgcode = errorcodes.SERIALIZATION_FAILURE
+
+        claims = self._create_open_claims(self.orders)
+        job = self._start_job(claims)
+        self.env.flush_all()
+        Job = type(job)
+        process_next_chunk = Job._process_next_chunk
+        conflicts = []
+
+        # El primer bloc topa amb un conflicte de serialització
+        def _process_next_chunk(job):
+            if not conflicts:
+                conflicts.append(job.id)
+                raise ConcurrencyError()
+            return process_next_chunk(job)
+
+        with patch.object(Job, '_process_next_chunk', _process_next_chunk):
+            job._run_workers(time.monotonic() + 60)
+
+        self.assertEqual(conflicts, [job.id])
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.done_count, len(claims))
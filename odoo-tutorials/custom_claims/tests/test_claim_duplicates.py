@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimDuplicates(ClaimCase):
+
+    order_count = 12
+
+    def setUp(self):
+        super().setUp()
+        if not self.env.registry.has_trigram:
+            self.skipTest("Cal l'extensió pg_trgm")
+        partner = self.partners[0]
+        self.partner_orders = self.orders.filtered(lambda order: order.partner_id == partner)
+        self.other_orders = self.orders - self.partner_orders
+
+    def _create_claim(self, order, subject, description, **context):
+        return self.env['custom.claim'].with_context(**context).create({
+            'subject': subject,
+            'description': description,
+            'sale_order_id': order.id,
+            'state': 'closed',
+        })
+
+    def test_detect_on_create(self):
+        original = self._create_claim(
+            self.partner_orders[0], 'Paquet arribat trencat', 'La caixa del televisor va arribar trencada')
+        # Mateix text d'un altre client: no és candidat
+        self._create_claim(
+            self.other_orders[0], 'Paquet arribat trencat', 'La caixa del televisor va arribar trencada')
+        claim = self._create_claim(
+            self.partner_orders[1], 'Paquet arribat trencat!', 'La caixa del televisor ha arribat trencada')
+        self.assertEqual(claim.duplicate_candidate_ids, original)
+        self.assertTrue(claim.duplicate_checked)
+
+        unrelated = self._create_claim(self.partner_orders[2], 'Factura duplicada', 'Ens han cobrat dues vegades')
+        self.assertFalse(unrelated.duplicate_candidate_ids)
+
+    def test_backfill_cron(self):
+        claims = self.env['custom.claim']
+        for i, order in enumerate(self.partner_orders[:6]):
+            claims |= self._create_claim(
+                order, f'No funciona el producte {i}', 'El producte no s\'encén', claim_bulk_mode=True)
+        self.assertFalse(any(claims.mapped('duplicate_checked')))
+        Claim = self.env['custom.claim']
+        while Claim.search_count([('duplicate_checked', '=', False)]):
+            Claim._cron_detect_duplicates(batch_size=4)
+        self.assertTrue(all(claims.mapped('duplicate_checked')))
+        self.assertTrue(all(len(claim.duplicate_candidate_ids) == 5 for claim in claims))
+
+        claims[0].subject = 'Un altre assumpte'
+        self.assertFalse(claims[0].duplicate_checked)
+
+    def test_threshold_validation(self):
+        Claim = self.env['custom.claim']
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('custom_claims.duplicate_threshold', '0.7')
+        self.assertEqual(Claim._get_duplicate_threshold(), 0.7)
+        # Els valors no numèrics o fora de [0, 1] tornen al valor per defecte
+        for value in ('alt', '1.5', '-0.1', 'nan'):
+            ICP.set_param('custom_claims.duplicate_threshold', value)
+            with self.assertLogs('odoo.addons.custom_claims.models.claim', 'WARNING'):
+                self.assertEqual(Claim._get_duplicate_threshold(), 0.5)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import io
+
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimImport(ClaimCase):
+
+    order_count = 8
+
+    def _csv_stream(self, orders, bad_rows=()):
+        lines = ['subject,description,sale_order']
+        for i, order in enumerate(orders):
+            order_name = 'DESCONEGUDA' if i in bad_rows else order.name
+            lines.append(f'Importada {i},Descripció importada,{order_name}')
+        return io.StringIO('\n'.join(lines) + '\n')
+
+    def test_import_stream_chunks(self):
+        Import = self.env['custom.claim.import']
+        stream = self._csv_stream(self.orders, bad_rows={3, 5})
+        result = Import._import_stream(stream, 'csv', chunk_size=3)
+        self.assertEqual(result['rows'], len(self.orders))
+        self.assertEqual(result['created'], len(self.orders) - 2)
+        self.assertEqual([row for row, _error in result['errors']], [5, 7])
+
+    def test_import_ignores_other_companies(self):
+        # Només es resolen les comandes de les companyies permeses
+        other_company = self.env['res.company'].create({'name': 'Altra companyia reclamacions'})
+        order = self.env['sale.order'].create({
+            'partner_id': self.orders[0].partner_id.id,
+            'company_id': other_company.id,
+        })
+        Import = self.env['custom.claim.import'].with_context(allowed_company_ids=self.env.company.ids)
+        result = Import._import_stream(self._csv_stream(order), 'csv')
+        self.assertEqual(result['created'], 0)
+        self.assertEqual([row for row, _error in result['errors']], [2])
+
+    @mute_logger('odoo.sql_db')
+    def test_import_isolates_failing_row(self):
+        # Dues files per a la mateixa comanda: la segona viola la restricció de
+        # reclamació oberta i només ella ha de quedar fora
+        order = self.orders[0]
+        stream = io.StringIO(
+            '{"subject": "A", "description": "A", "sale_order": "%s"}\n'
+            '{"subject": "B", "description": "B", "sale_order": "%s"}\n'
+            'no és json\n' % (order.name, order.name))
+        result = self.env['custom.claim.import']._import_stream(stream, 'jsonl', chunk_size=10)
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(sorted(row for row, _error in result['errors']), [2, 3])
+        self.assertEqual(len(order.claim_ids), 1)
+
+    def test_wizard_reads_attachment(self):
+        content = self._csv_stream(self.orders[:3]).getvalue().encode()
+        wizard = self.env['custom.claim.import'].create({
+            'file': base64.b64encode(content),
+            'filename': 'reclamacions.csv',
+            'chunk_size': 2,
+        })
+        wizard.action_import()
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(wizard.created_count, 3)
+
+    def test_cli_commands_registered(self):
+        # Les ordres només existeixen si el paquet `cli` s'importa amb el mòdul
+        from odoo.cli.command import commands
+        from odoo.addons.custom_claims.cli.claims_api_load_test import ClaimsApiLoadTest
+        from odoo.addons.custom_claims.cli.claims_import import ClaimsImport
+        self.assertIs(commands.get('claims_import'), ClaimsImport)
+        self.assertIs(commands.get('claims_api_load_test'), ClaimsApiLoadTest)
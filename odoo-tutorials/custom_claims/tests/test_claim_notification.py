@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ClaimCase, FakeSMTPServer
+
+
+@tagged('post_install', '-at_install')
+class TestClaimNotification(ClaimCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.smtp_server = FakeSMTPServer()
+        threading.Thread(target=cls.smtp_server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.smtp_server.server_close)
+        cls.addClassCleanup(cls.smtp_server.shutdown)
+        host, port = cls.smtp_server.server_address
+        cls.env['ir.mail_server'].create({
+            'name': 'SMTP local de proves',
+            'smtp_host': host,
+            'smtp_port': port,
+            'smtp_encryption': 'none',
+            'sequence': 0,
+        })
+
+    def test_cancel_order_queues_notifications(self):
+        claims = self._create_open_claims(self.orders)
+        claims.action_cancel_order()
+        self.assertEqual(self.smtp_server.connections, 0)
+
+        notifications = self.env['custom.claim.notification'].search([('claim_id', 'in', claims.ids)])
+        self.assertEqual(len(notifications), len(claims))
+        self.assertEqual(set(notifications.mapped('state')), {'pending'})
+
+        # El cron és qui parla amb el servidor SMTP, fora de la petició de l'usuari
+        IrMailServer = type(self.env['ir.mail_server'])
+        with patch.object(IrMailServer, '_is_test_mode', lambda self: False):
+            self.env['custom.claim.notification']._cron_send_notifications()
+        self.assertEqual(set(notifications.mapped('state')), {'sent'})
+        self.assertEqual(len(self.smtp_server.messages), len(claims))
+
+    def test_retry_backoff(self):
+        claims = self._create_open_claims(self.orders[:1])
+        claims.action_cancel_order()
+        notification = self.env['custom.claim.notification'].search([('claim_id', '=', claims.id)])
+        Notification = type(notification)
+        delays = []
+        for attempt in range(1, Notification._max_attempts):
+            before = fields.Datetime.now()
+            notification._schedule_retry('Error de connexió')
+            self.assertEqual((notification.attempts, notification.state), (attempt, 'pending'))
+            delays.append(round((notification.next_attempt - before).total_seconds() / 60))
+        # Espera exponencial entre intents i fallida en esgotar-los
+        self.assertEqual(delays, [Notification._retry_base_minutes * 2 ** i for i in range(len(delays))])
+        notification._schedule_retry('Error de connexió')
+        self.assertEqual(notification.state, 'failed')
+        self.assertEqual(notification.last_error, 'Error de connexió')
+
+        notification.action_retry()
+        self.assertEqual((notification.state, notification.attempts), ('pending', 0))
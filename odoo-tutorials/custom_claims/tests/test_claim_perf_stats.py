@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimPerfStats(ClaimCase):
+
+    order_count = 6
+
+    def test_disabled_records_nothing(self):
+        Sample = self.env['custom.claim.perf.sample']
+        self.assertFalse(Sample._is_enabled())
+        claims = self._create_open_claims(self.orders)
+        claims.action_close()
+        self.assertFalse(Sample.search_count([]))
+
+    def test_aggregate_and_prometheus(self):
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.perf_enabled', 'True')
+        for orders in (self.orders[:1], self.orders[1:3], self.orders[3:6]):
+            claims = self._create_open_claims(orders)
+            claims.action_close()
+
+        Stat = self.env['custom.claim.perf.stat']
+        Stat._cron_aggregate()
+        stats = {stat.operation: stat for stat in Stat.search([])}
+        self.assertEqual(stats['custom.claim.create'].call_count, 3)
+        self.assertEqual(stats['custom.claim.create'].record_count, 6)
+        self.assertEqual(stats['custom.claim.action_close'].call_count, 3)
+        close = stats['custom.claim.action_close']
+        self.assertLessEqual(close.duration_p50, close.duration_p99)
+        self.assertGreater(close.query_count_avg, 0)
+
+        text = Stat._prometheus_text()
+        self.assertIn('# TYPE custom_claim_duration_seconds_p95 gauge', text)
+        self.assertIn('# TYPE custom_claim_calls gauge', text)
+        self.assertIn('custom_claim_calls{operation="custom.claim.create"} 3', text)
+        self.assertNotIn('counter', text)
+
+    def test_failed_call_not_recorded(self):
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.perf_enabled', 'True')
+        order = self.orders[0]
+        self._create_open_claims(order)
+        Sample = self.env['custom.claim.perf.sample']
+        before = Sample.search_count([('operation', '=', 'custom.claim.create')])
+        # La segona reclamació oberta falla: l'error original arriba a qui crida
+        # i no es desa cap mostra
+        with self.assertRaises(ValidationError):
+            self._create_open_claims(order)
+        self.assertEqual(Sample.search_count([('operation', '=', 'custom.claim.create')]), before)
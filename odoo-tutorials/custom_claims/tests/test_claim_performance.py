@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+
+import io
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from .common import ClaimPerformanceCase, FakeSMTPServer
+
+
+@tagged('-standard', 'claim_perf', 'post_install', '-at_install')
+class TestClaimPerformance(ClaimPerformanceCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Volum gran de reclamacions tancades (poden compartir comanda)
+        seed_env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_create_nolog=True))
+        users = cls.user | cls.env.user
+        now = fields.Datetime.now()
+        cls.closed_claims = seed_env['custom.claim'].create([{
+            'subject': f'Reclamació històrica {i}',
+            'description': 'Descripció de la reclamació històrica',
+            'sale_order_id': cls.orders[i % len(cls.orders)].id,
+            'user_id': users[i % len(users)].id,
+            'state': 'closed' if i % 2 else 'canceled',
+            'close_date': now,
+        } for i in range(cls.claim_volume)])
+        # Unes quantes comandes confirmades i facturades per als comptadors
+        confirmed = cls.orders[-10:]
+        confirmed.action_confirm()
+        confirmed._create_invoices()
+
+    def _claim_vals(self, count):
+        return [{
+            'subject': f'Reclamació lot {i}',
+            'description': 'Descripció',
+            'sale_order_id': self.orders[i % len(self.orders)].id,
+            'state': 'closed',
+        } for i in range(count)]
+
+    def test_create_sequence_block(self):
+        sequence = self.env.ref('custom_claims.seq_custom_claim')
+        for implementation in ('standard', 'no_gap'):
+            sequence.implementation = implementation
+            for block in (False, True):
+                self.env.company.claim_sequence_block = block
+                for size in (1, 10, 1000):
+                    label = f'Claim.create [{implementation}, bloc={block}]'
+                    with self.measure(label, size, budget=(60, 15)):
+                        claims = self.env['custom.claim'].create(self._claim_vals(size))
+                    self.assertEqual(len(set(claims.mapped('name'))), size)
+
+    def test_check_open_claims_constant(self):
+        # Consultes de la comprovació de reclamacions obertes dins de create i write
+        Claim = type(self.env['custom.claim'])
+        check_open_claim_orders = Claim._check_open_claim_orders
+        check_queries = []
+
+        def counted_check(claim_self, order_ids, excluded_ids=()):
+            queries_before = self.cr.sql_log_count
+            check_open_claim_orders(claim_self, order_ids, excluded_ids)
+            check_queries.append(self.cr.sql_log_count - queries_before)
+
+        counts = []
+        with patch.object(Claim, '_check_open_claim_orders', counted_check):
+            for size in (10, len(self.orders) // 2):
+                check_queries.clear()
+                with self.measure('create (reclamacions obertes)', size):
+                    claims = self._create_open_claims(self.orders[:size])
+                with self.measure('write (estat obert)', size):
+                    claims.write({'state': 'in_progress'})
+                self.assertEqual(len(check_queries), 2)
+                counts.append(check_queries[:])
+                claims.unlink()
+        self.assertEqual(counts[0], counts[1], "La restricció no ha de dependre de la mida del lot")
+
+    def test_compute_invoice_shipment_constant(self):
+        claims = self.closed_claims
+        claims.fetch(['sale_order_id'])
+        # Escalfar les memòries cau de regles i metadades
+        claims[:1]._compute_invoice_shipment()
+        counts = []
+        for size in (1, 100, len(claims)):
+            with self.measure('_compute_invoice_shipment', size) as stats:
+                claims[:size]._compute_invoice_shipment()
+            counts.append(stats['queries'])
+        self.assertEqual(len(set(counts)), 1, f"Consultes per mida: {counts}")
+        confirmed = claims.filtered(lambda c: c.sale_order_id in self.orders[-10:])
+        self.assertTrue(all(claim.shipment_count for claim in confirmed))
+        self.assertTrue(all(claim.invoice_count for claim in confirmed))
+
+    def test_stored_invoice_shipment(self):
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.stored_invoice_shipment', 'True')
+        claims = self._create_open_claims(self.orders[-10:])
+        # En mode emmagatzemat la lectura no consulta factures ni enviaments
+        self.env.invalidate_all()
+        with self.measure('_compute_invoice_shipment (emmagatzemat)', len(claims)) as stats:
+            claims.mapped('invoice_count')
+        self.assertEqual(stats['queries'], 1)
+
+    def test_action_close(self):
+        claims = self._create_open_claims(self.orders)
+        with self.measure('action_close', len(claims), budget=(40, 10)):
+            claims.action_close()
+        self.assertEqual(set(claims.mapped('state')), {'closed'})
+
+    def test_action_cancel(self):
+        claims = self._create_open_claims(self.orders[:-10])
+        with self.measure('action_cancel', len(claims), budget=(80, 15)):
+            claims.action_cancel()
+        self.assertEqual(set(claims.mapped('state')), {'canceled'})
+
+    def test_action_reopen(self):
+        claims = self._create_open_claims(self.orders)
+        claims.action_close()
+        with self.measure('action_reopen', len(claims), budget=(40, 10)):
+            claims.action_reopen()
+        self.assertEqual(set(claims.mapped('state')), {'new'})
+
+    def test_claim_stats_counters(self):
+        orders = self.orders[:20]
+        with self.measure('comptadors a la creació', len(orders), budget=(40, 6)):
+            self._create_open_claims(orders)
+        self.assertEqual(set(orders.mapped('open_claim_count')), {1})
+
+        # Ordenar i filtrar clients per reclamacions obertes llegeix la columna
+        self.env.flush_all()
+        queries_before = self.cr.sql_log_count
+        self.env['res.partner'].search([('open_claim_count', '>', 0)], order='open_claim_count desc', limit=80)
+        self.assertEqual(self.cr.sql_log_count - queries_before, 1)
+
+    def test_action_cancel_order(self):
+        claims = self._create_open_claims(self.orders[:-10])
+        with self.measure('action_cancel_order', len(claims), budget=(80, 25)):
+            claims.action_cancel_order()
+        self.assertEqual(set(claims.mapped('state')), {'canceled'})
+
+    def _count_rows(self, table):
+        self.env.flush_all()
+        self.cr.execute(SQL("SELECT COUNT(*) FROM %s", SQL.identifier(table)))
+        return self.cr.fetchone()[0]
+
+    def test_bulk_reassignment_write_amplification(self):
+        # Reassignació de tot el volum de reclamacions, primer amb el seguiment
+        # per registre i després en mode en bloc a un altre usuari, que rebria
+        # una notificació per reclamació si se'l subscrigués
+        claims = self.closed_claims
+        other_user = self.user.copy({'name': 'Responsable escalat', 'login': 'claim_perf_other'})
+        other_user.notification_type = 'email'
+        tables = (
+            'mail_message', 'mail_tracking_value', 'mail_followers', 'mail_notification', 'mail_mail',
+            'custom_claim_audit',
+        )
+        for label, records, user in (
+            ('reassignació amb seguiment', claims, self.user),
+            ('reassignació en bloc', claims.with_context(claim_bulk_mode=True), other_user),
+        ):
+            before = {table: self._count_rows(table) for table in tables}
+            with self.measure(label, len(claims)) as stats:
+                records.write({'user_id': user.id})
+            stats['rows'] = {table: self._count_rows(table) - before[table] for table in tables}
+        bulk_rows = type(self).results[-1]['rows']
+        self.assertEqual(bulk_rows, dict.fromkeys(tables, 0) | {'custom_claim_audit': 1})
+        audit = self.env['custom.claim.audit'].search([], limit=1)
+        self.assertEqual(audit.claim_count, len(claims))
+        self.assertEqual(audit.changes['user_id']['old'], {str(self.user.id): len(claims)})
+
+    def test_claim_message_create(self):
+        claims = self._create_open_claims(self.orders)
+        vals_list = [{
+            'claim_id': claims[i % len(claims)].id,
+            'content': f'Missatge {i}',
+        } for i in range(self.message_volume)]
+        # La inserció dels missatges és per lots; el cost per reclamació ve del
+        # seguiment del canvi d'estat, que es fa en una sola escriptura
+        budget = (60 + 10 * len(claims), 1)
+        with self.measure('ClaimMessage.create', len(vals_list), budget=budget):
+            self.env['custom.claim.message'].create(vals_list)
+        self.assertEqual(set(claims.mapped('state')), {'in_progress'})
+
+    def test_list_and_form_read(self):
+        Claim = self.env['custom.claim'].with_user(self.user)
+        many2one = {'fields': {'display_name': {}}}
+        list_spec = {
+            'name': {}, 'subject': {}, 'state': {}, 'create_date': {},
+            'sale_order_id': many2one, 'partner_id': many2one, 'user_id': many2one,
+        }
+        Claim.web_search_read([], list_spec, limit=80)
+        with self.measure('list read', 80, budget=(20, 0)):
+            Claim.web_search_read([], list_spec, limit=80)
+
+        claim = Claim.search([], limit=1)
+        form_spec = dict(
+            list_spec,
+            description={}, resolution={}, close_date={}, write_date={},
+            invoice_count={}, shipment_count={}, closure_reason_id=many2one,
+            recent_message_ids={'fields': {'create_date': {}, 'author_id': many2one, 'content': {}}},
+            has_older_messages={},
+        )
+        self.env.invalidate_all()
+        with self.measure('form read', 1, budget=(30, 0)):
+            claim.web_read(form_spec)
+
+        # El cost d'obrir el formulari no depèn de la llargada del fil
+        short_claim, long_claim = self.closed_claims.filtered(lambda c: c.user_id == self.user)[:2]
+        self.env['custom.claim.message'].create([{'claim_id': short_claim.id, 'content': f'Curt {i}'} for i in range(5)])
+        self.env['custom.claim.message'].create([
+            {'claim_id': long_claim.id, 'content': f'Llarg {i}'} for i in range(self.message_volume)])
+        counts = []
+        for label, record in (('form read (fil curt)', short_claim), ('form read (fil llarg)', long_claim)):
+            self.env.invalidate_all()
+            with self.measure(label, 1) as stats:
+                record.with_user(self.user).web_read(form_spec)
+            counts.append(stats['queries'])
+        self.assertEqual(counts[0], counts[1])
+
+    def test_text_search(self):
+        claims = self.closed_claims
+        words = ['retard', 'trencat', 'devolució', 'factura', 'embalatge']
+        self.env['custom.claim.message'].create([{
+            'claim_id': claims[i % len(claims)].id,
+            'content': f'El client indica {words[i % len(words)]} al paquet {i}',
+        } for i in range(self.message_volume)])
+        self.env.flush_all()
+        self.cr.execute("ANALYZE custom_claim, custom_claim_message")
+        Claim = self.env['custom.claim']
+        with self.measure('cerca de text', self.message_volume, budget=(10, 0)) as stats:
+            found = Claim.search([('text_search', 'ilike', 'embalatge')], limit=80)
+        self.assertTrue(found)
+        # La unió va com a subconsulta dins de la mateixa consulta de cerca
+        self.assertEqual(stats['queries'], 1)
+        with self.measure('cerca de text ordenada per rellevància', self.message_volume, budget=(10, 0)):
+            result = Claim.web_search_read([('text_search', 'ilike', 'històrica')], {'name': {}}, limit=80)
+        self.assertTrue(result['records'])
+
+    def _explain(self, records, domain):
+        query = records._search(domain, limit=80)
+        self.cr.execute(SQL("EXPLAIN %s", query.select()))
+        return '\n'.join(row[0] for row in self.cr.fetchall())
+
+    def test_list_searches_use_indexes(self):
+        self.env.flush_all()
+        self.cr.execute("ANALYZE custom_claim")
+        Claim = self.env['custom.claim']
+        cases = [
+            ('regla per responsable', Claim.with_user(self.user), []),
+            ('filtre per estat', Claim, [('state', '=', 'closed')]),
+            ('comanda i estat', Claim, [('sale_order_id', '=', self.orders[0].id), ('state', '=', 'closed')]),
+            ('client', Claim, [('partner_id', '=', self.partners[0].id)]),
+        ]
+        for label, records, domain in cases:
+            with self.subTest(label):
+                plan = self._explain(records, domain)
+                self.assertNotIn('Seq Scan on custom_claim', plan)
+                self.assertIn('Index', plan)
+
+    def test_closure_reason_lookup_cost(self):
+        Reason = self.env['custom.closure.reason']
+        Reason.create([{'name': f'Motiu {i}', 'code': f'M{i:03d}'} for i in range(50)])
+        calls = 1000
+        codes = [f'M{i % 50:03d}' for i in range(calls)]
+        with self.measure('motiu per codi (search)', calls) as search_stats:
+            for code in codes:
+                Reason.search([('code', '=', code)], limit=1).id
+        Reason._get_reason_data()
+        with self.measure('motiu per codi (memòria cau)', calls) as cached_stats:
+            for code in codes:
+                Reason._lookup_code(code)
+        self.assertEqual(search_stats['queries'], calls)
+        self.assertEqual(cached_stats['queries'], 0)
+        self.assertLess(cached_stats['seconds'], search_stats['seconds'])
+
+    def test_api_intake(self):
+        Api = self.env['custom.claim.api']
+        rows = [{
+            'subject': f'Reclamació API {i}',
+            'description': 'Rebuda per API',
+            'sale_order': order.name,
+        } for i, order in enumerate(self.orders)]
+        with self.measure('API: alta de reclamacions', len(rows), budget=(60, 15)):
+            result = Api._intake(rows, [])
+        references = [item['reference'] for item in result['claims']]
+        messages = [{'claim': reference, 'content': 'Seguiment'} for reference in references]
+        with self.measure('API: alta de missatges', len(messages), budget=(60, 10)):
+            Api._intake([], messages)
+
+        self.env.flush_all()
+        with self.measure('API: validador d\'estat', len(references)) as stats:
+            Api._status_validator(references)
+        self.assertEqual(stats['queries'], 1)
+
+    def test_import_stream(self):
+        lines = ['subject,description,sale_order'] + [
+            f'Importada {i},Descripció importada,{order.name}' for i, order in enumerate(self.orders)]
+        stream = io.StringIO('\n'.join(lines) + '\n')
+        with self.measure('importació CSV', len(self.orders)) as stats:
+            result = self.env['custom.claim.import']._import_stream(stream, 'csv', chunk_size=50)
+        stats['rows_per_second'] = result['rows_per_second']
+        self.assertEqual(result['created'], len(self.orders))
+
+    def test_detect_duplicates_on_create(self):
+        if not self.env.registry.has_trigram:
+            self.skipTest("Cal l'extensió pg_trgm")
+        with self.measure('duplicats a la creació', 1) as stats:
+            self._create_open_claims(self.orders[:1])
+        self.assertLess(stats['seconds'], 1.0)
+
+    def test_mass_cancel_job(self):
+        claims = self._create_open_claims(self.orders[:-10])
+        action = claims.action_mass_cancel_order()
+        job = self.env['custom.claim.cancel.job'].browse(action['res_id'])
+        job.chunk_size = 50
+        job.action_start()
+        with self.measure('cancel·lació massiva', len(claims)):
+            self.env['custom.claim.cancel.job']._cron_process_jobs(threaded=False)
+        self.assertEqual(job.done_count, len(claims))
+
+    def test_profiling_overhead(self):
+        with self.measure('create sense instrumentació', 50) as disabled:
+            claims = self._create_open_claims(self.orders[:50])
+        claims.unlink()
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.perf_enabled', 'True')
+        with self.measure('create amb instrumentació', 50) as enabled:
+            self._create_open_claims(self.orders[:50])
+        # Activada, només afegeix una inserció per crida instrumentada
+        self.assertLessEqual(enabled['queries'] - disabled['queries'], 2)
+
+    def test_archive_claims(self):
+        claims = self._create_open_claims(self.orders)
+        self.env['custom.claim.message'].create([
+            {'claim_id': claim.id, 'content': f'Missatge {i}'} for claim in claims for i in range(3)])
+        claims.action_close()
+        claims.write({'close_date': fields.Datetime.now() - timedelta(days=400)})
+        with self.measure('arxivament', len(claims), budget=(60, 2)):
+            self.env['custom.claim.archive']._cron_archive_claims(batch_size=len(claims))
+        self.assertFalse(claims.exists())
+
+    def test_sla_escalation(self):
+        self.env['ir.config_parameter'].sudo().set_param('custom_claims.sla_escalation_user_id', self.env.user.id)
+        overdue = self._create_overdue_claims(self.orders)
+        with self.measure('escalat SLA', len(overdue), budget=(60, 6)):
+            self.env['custom.claim']._cron_escalate_sla(batch_size=50)
+        self.assertTrue(all(overdue.mapped('escalated')))
+
+
+@tagged('-standard', 'claim_perf', 'post_install', '-at_install')
+class TestClaimNotificationPerformance(ClaimPerformanceCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Servidor SMTP local lent: cada resposta triga smtp_delay segons
+        cls.smtp_delay = 2.0
+        cls.smtp_server = FakeSMTPServer(delay=cls.smtp_delay)
+        threading.Thread(target=cls.smtp_server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.smtp_server.server_close)
+        cls.addClassCleanup(cls.smtp_server.shutdown)
+        host, port = cls.smtp_server.server_address
+        cls.env['ir.mail_server'].create({
+            'name': 'SMTP local de proves',
+            'smtp_host': host,
+            'smtp_port': port,
+            'smtp_encryption': 'none',
+            'sequence': 0,
+        })
+
+    def test_cancel_order_does_not_wait_for_smtp(self):
+        claims = self._create_open_claims(self.orders[:5])
+        with self.measure('action_cancel_order (cua)', len(claims)) as stats:
+            claims.action_cancel_order()
+        self.assertLess(stats['seconds'], self.smtp_delay)
+
+        IrMailServer = type(self.env['ir.mail_server'])
+        with patch.object(IrMailServer, '_is_test_mode', lambda self: False):
+            with self.measure('enviament de notificacions', len(claims)) as stats:
+                self.env['custom.claim.notification']._cron_send_notifications()
+        self.assertGreaterEqual(stats['seconds'], self.smtp_delay)
+        self.assertEqual(len(self.smtp_server.messages), len(claims))
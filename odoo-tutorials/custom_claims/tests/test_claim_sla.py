@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClaimSla(ClaimCase):
+
+    order_count = 6
+
+    def test_escalation_in_batches(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        escalation_user = self.user.copy({'name': 'Responsable escalat', 'login': 'claim_sla_escalation'})
+        escalation_user.notification_type = 'email'
+        ICP.set_param('custom_claims.sla_escalation_user_id', escalation_user.id)
+        claims = self._create_overdue_claims(self.orders)
+        recent = claims[:2]
+        self.cr.execute(
+            "UPDATE custom_claim SET sla_deadline = %s WHERE id = ANY(%s)",
+            [fields.Datetime.now() + timedelta(hours=1), recent.ids],
+        )
+        recent.invalidate_recordset()
+        overdue = claims - recent
+
+        # Desar el punt de control no ha de buidar la memòria cau del registre
+        with patch.object(type(self.env.registry), 'clear_cache') as clear_cache:
+            self.env['custom.claim']._cron_escalate_sla(batch_size=3)
+        clear_cache.assert_not_called()
+        self.assertTrue(all(overdue.mapped('escalated')))
+        self.assertFalse(any(recent.mapped('escalated')))
+        self.assertEqual(overdue.user_id, escalation_user)
+        # La reassignació en bloc no subscriu ni notifica el responsable per reclamació
+        self.assertNotIn(escalation_user.partner_id, overdue.message_partner_ids)
+        self.assertFalse(self.env['mail.mail'].search([('recipient_ids', 'in', escalation_user.partner_id.ids)]))
+        activities = self.env['mail.activity'].search([('res_model', '=', 'custom.claim'), ('res_id', 'in', overdue.ids)])
+        self.assertEqual(len(activities), len(overdue))
+        self.assertFalse(self.env['custom.claim.checkpoint']._get_value('sla_escalation'))
+
+    def test_resume_from_checkpoint(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        claims = self._create_overdue_claims(self.orders)
+        # Temps esgotat després del primer lot: queda un punt de control
+        ICP.set_param('custom_claims.sla_max_seconds', 0)
+        self.env['custom.claim']._cron_escalate_sla(batch_size=2)
+        checkpoint = self.env['custom.claim.checkpoint']._get_value('sla_escalation')
+        self.assertTrue(checkpoint)
+        self.assertEqual(len(claims.filtered('escalated')), 2)
+
+        ICP.set_param('custom_claims.sla_max_seconds', 300)
+        self.env['custom.claim']._cron_escalate_sla(batch_size=2)
+        self.assertTrue(all(claims.mapped('escalated')))
+        self.assertFalse(self.env['custom.claim.checkpoint']._get_value('sla_escalation'))
+
+    def test_reopen_clears_escalation(self):
+        claims = self._create_overdue_claims(self.orders[:2])
+        self.env['custom.claim']._cron_escalate_sla()
+        claims.action_close()
+        self.assertFalse(any(claims.mapped('sla_deadline')))
+        claims.action_reopen()
+        self.assertFalse(any(claims.mapped('escalated')))
+        # El termini torna a començar amb la reobertura, no amb la creació
+        now = fields.Datetime.now()
+        self.assertTrue(all(deadline > now for deadline in claims.mapped('sla_deadline')))
+
+    def test_state_change_restarts_deadline(self):
+        claims = self._create_overdue_claims(self.orders[:2])
+        claims.write({'state': 'in_progress'})
+        now = fields.Datetime.now()
+        self.assertTrue(all(deadline > now for deadline in claims.mapped('sla_deadline')))
+        self.assertFalse(self.env['custom.claim']._get_sla_batch(now, None, 100))
+
+    def test_overdue_filter_uses_current_time(self):
+        claims = self._create_open_claims(self.orders[:2])
+        # Vençuda fa un minut, és a dir, avui mateix
+        self.cr.execute(
+            "UPDATE custom_claim SET sla_deadline = %s WHERE id = %s",
+            [fields.Datetime.now() - timedelta(minutes=1), claims[0].id],
+        )
+        claims.invalidate_recordset()
+        overdue = self.env['custom.claim'].search([('sla_overdue', '=', True), ('id', 'in', claims.ids)])
+        self.assertEqual(overdue, claims[0])
+        self.assertEqual(claims.mapped('sla_overdue'), [True, False])
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import ClaimCase
+
+
+@tagged('post_install', '-at_install')
+class TestClosureReason(ClaimCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Reason = cls.env['custom.closure.reason']
+        cls.reasons = Reason.create([{'name': f'Motiu {i}', 'code': f'M{i:03d}'} for i in range(3)])
+        cls.archived = Reason.create({'name': 'Motiu arxivat', 'code': 'ARX', 'active': False})
+
+    def test_lookup_active_and_invalidation(self):
+        Reason = self.env['custom.closure.reason']
+        reason = self.reasons[0]
+        self.assertEqual(Reason._lookup_code(reason.code), reason.id)
+        self.assertFalse(Reason._lookup_code('ARX'))
+        self.assertEqual(Reason._lookup_code('ARX', active_test=False), self.archived.id)
+        self.assertNotIn('ARX', Reason._get_code_map())
+
+        reason.write({'active': False})
+        self.assertFalse(Reason._lookup_code(reason.code))
+        reason.write({'active': True, 'name': 'Motiu reanomenat'})
+        self.assertEqual(Reason._get_name_by_code(reason.code), 'Motiu reanomenat')
+        new_reason = Reason.create({'name': 'Motiu nou', 'code': 'NOU'})
+        self.assertEqual(Reason._lookup_code('NOU'), new_reason.id)
+        new_reason.unlink()
+        self.assertFalse(Reason._lookup_code('NOU'))
+
+    def test_close_by_reason_code(self):
+        claims = self._create_open_claims(self.orders)
+        reason = self.reasons[1]
+        claims.with_context(closure_reason_code=reason.code).action_close()
+        self.assertEqual(claims.closure_reason_id, reason)
@@ -0,0 +1 @@
+from . import claim_import
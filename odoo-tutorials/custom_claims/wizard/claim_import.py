@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import csv
+import io
+import json
+import time
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+
+class ClaimImport(models.TransientModel):
+    _name = 'custom.claim.import'
+    _description = 'Importació massiva de reclamacions'
+
+    # Nombre màxim d'errors de fila que es desen al resultat
+    _max_reported_errors = 1000
+
+    file = fields.Binary(string='Fitxer', required=True)
+    filename = fields.Char(string='Nom del fitxer')
+    file_format = fields.Selection(
+        selection=[
+            ('csv', 'CSV'),
+            ('jsonl', 'JSON Lines')],
+        string='Format',
+        default='csv',
+        required=True
+    )
+    chunk_size = fields.Integer(string='Mida del bloc', default=1000, required=True)
+    state = fields.Selection(
+        selection=[
+            ('draft', 'Esborrany'),
+            ('done', 'Importat')],
+        default='draft'
+    )
+    created_count = fields.Integer(string='Reclamacions creades', readonly=True)
+    error_count = fields.Integer(string='Files amb errors', readonly=True)
+    duration = fields.Float(string='Durada (s)', readonly=True)
+    rows_per_second = fields.Float(string='Files per segon', readonly=True)
+    error_log = fields.Text(string='Errors', readonly=True)
+
+    def action_import(self):
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_('La mida del bloc ha de ser positiva.'))
+        with self._open_file() as binary:
+            stream = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+            stats = self._import_stream(stream, self.file_format, chunk_size=self.chunk_size)
+        self.write({
+            'state': 'done',
+            'created_count': stats['created'],
+            'error_count': stats['error_count'],
+            'duration': stats['seconds'],
+            'rows_per_second': stats['rows_per_second'],
+            'error_log': '\n'.join(_('Fila %(row)s: %(error)s', row=row, error=error) for row, error in stats['errors']),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    # Obrir el fitxer pujat directament des del magatzem de fitxers, sense
+    # descodificar-lo sencer en memòria; només els adjunts desats a la base de
+    # dades es llegeixen d'una vegada
+    def _open_file(self):
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or base64.b64decode(self.file or b''))
+
+    # Llegir les files d'un fitxer CSV o JSON Lines sense carregar-lo sencer:
+    # genera (número de fila, diccionari de valors, error)
+    @api.model
+    def _iter_rows(self, stream, file_format):
+        if file_format == 'csv':
+            for row_number, row in enumerate(csv.DictReader(stream), start=2):
+                yield row_number, row, None
+            return
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, str(e)
+                continue
+            if isinstance(row, dict):
+                yield row_number, row, None
+            else:
+                yield row_number, None, _('La línia no és un objecte JSON')
+
+    # Comandes referenciades per un bloc de files, només de les companyies
+    # permeses: una consulta per bloc, acotada als noms del bloc
+    @api.model
+    def _get_order_map(self, order_names):
+        orders = self.env['sale.order'].search_fetch(
+            [('name', 'in', list(order_names)), ('company_id', 'in', self.env.companies.ids)], ['name'])
+        return {order.name: order.id for order in orders}
+
+    @api.model
+    def _prepare_claim_vals(self, row, orders, reasons):
+        order_name = (row.get('sale_order') or '').strip()
+        if order_name not in orders:
+            return None, _('Comanda desconeguda: %s', order_name)
+        vals = {
+            'subject': row.get('subject'),
+            'description': row.get('description'),
+            'sale_order_id': orders[order_name],
+        }
+        if row.get('resolution'):
+            vals['resolution'] = row['resolution']
+        reason_code = (row.get('closure_reason') or '').strip()
+        if reason_code:
+            if reason_code not in reasons:
+                return None, _('Motiu de tancament desconegut: %s', reason_code)
+            vals['closure_reason_id'] = reasons[reason_code]
+        return vals, None
+
+    # Importar un fitxer per blocs: cada bloc es crea dins d'un punt de
+    # restauració i, si falla, es reprèn fila a fila per aïllar les files errònies
+    @api.model
+    def _import_stream(self, stream, file_format, chunk_size=1000, auto_commit=False):
+        start = time.monotonic()
+        # Els motius de tancament són pocs: un sol mapa per fitxer
+        reasons = self.env['custom.closure.reason']._get_code_map()
+        stats = {'rows': 0, 'created': 0, 'error_count': 0, 'errors': []}
+
+        def add_error(row_number, error):
+            stats['error_count'] += 1
+            if len(stats['errors']) < self._max_reported_errors:
+                stats['errors'].append((row_number, error))
+
+        for chunk in split_every(chunk_size, self._iter_rows(stream, file_format), list):
+            batch = []
+            orders = self._get_order_map({
+                (row.get('sale_order') or '').strip() for _row_number, row, error in chunk if error is None})
+            for row_number, row, error in chunk:
+                stats['rows'] += 1
+                if error is None:
+                    vals, error = self._prepare_claim_vals(row, orders, reasons)
+                if error:
+                    add_error(row_number, error)
+                else:
+                    batch.append((row_number, vals))
+            stats['created'] += self._create_chunk(batch, add_error)
+            if auto_commit:
+                self.env.cr.commit()
+            else:
+                self.env.flush_all()
+            # Alliberar la memòria cau entre blocs
+            self.env.invalidate_all()
+
+        stats['seconds'] = time.monotonic() - start
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    @api.model
+    def _create_chunk(self, batch, add_error):
+        if not batch:
+            return 0
+        Claim = self.env['custom.claim'].with_context(claim_bulk_mode=True, claim_bulk_operation='import')
+        try:
+            with self.env.cr.savepoint():
+                Claim.create([vals for _row_number, vals in batch])
+            return len(batch)
+        except Exception:
+            created = 0
+            for row_number, vals in batch:
+                try:
+                    with self.env.cr.savepoint():
+                        Claim.create([vals])
+                    created += 1
+                except Exception as e:
+                    add_error(row_number, str(e))
+            return created